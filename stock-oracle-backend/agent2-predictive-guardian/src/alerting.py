@@ -0,0 +1,220 @@
+# src/alerting.py — vectorized stock-out alerting over a whole SKU x location grid
+# Run with: python alerting.py --inventory ../data/inventory.csv --forecasts ../output/forecasts.npy
+#
+# Inventory table (CSV or Parquet), one row per SKU-location:
+#   sku, location, on_hand           required
+#   on_order, lead_time_days, pack_size   optional (default 0 / DEFAULT_LEAD_TIME / 1)
+# Lead times can also come from a separate supplier table (sku -> lead_time_days).
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_LEAD_TIME = 7  # days from order to shelf when no lead time is known
+REVIEW_DAYS = 7        # reorders cover lead time + one review period (the old 7-day window)
+SAFETY_FACTOR = 0.2    # safety stock as a share of lead-time demand when no quantiles are given
+SEVERITY_RANK = {"warning": 1, "critical": 2}
+LEDGER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output", "alert_ledger.parquet")
+
+
+def load_inventory(path, lead_times=None):
+    """Reads the inventory grid and fills the optional columns; lead_times is an optional sku table."""
+    inventory = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    missing = {"sku", "location", "on_hand"} - set(inventory.columns)
+    if missing:
+        raise ValueError(f"Inventory {path} is missing columns {sorted(missing)}")
+    if lead_times is not None:
+        if isinstance(lead_times, str):
+            lead_times = pd.read_parquet(lead_times) if lead_times.endswith(".parquet") else pd.read_csv(lead_times)
+        inventory = inventory.drop(columns="lead_time_days", errors="ignore").merge(
+            lead_times[["sku", "lead_time_days"]], on="sku", how="left")
+    return inventory
+
+
+def align_forecasts(index, matrix, inventory):
+    """
+    Forecast rows matching each inventory row, joined on (sku, location) when the
+    forecast index has a location column and on sku alone otherwise.
+    Returns (inventory rows that have a forecast, matching [n, H] matrix).
+    """
+    keys = ["sku", "location"] if "location" in index.columns and "location" in inventory.columns else ["sku"]
+    extra = [c for c in index.columns if c not in inventory.columns]  # e.g. product names
+    positions = index[keys + extra].assign(_row=np.arange(len(index))).drop_duplicates(keys)
+    joined = inventory.merge(positions, on=keys, how="inner")
+    return joined.drop(columns="_row").reset_index(drop=True), np.asarray(matrix)[joined["_row"].to_numpy()]
+
+
+def _cum_at(cum, days):
+    """Cumulative demand through day `days` per row; past the horizon it extends at the mean rate."""
+    horizon = cum.shape[1]
+    idx = np.clip(days, 1, horizon) - 1
+    within = np.take_along_axis(cum, idx[:, None], axis=1)[:, 0]
+    extra = np.maximum(days - horizon, 0) * cum[:, -1] / horizon
+    return np.where(days > 0, within + extra, 0.0)
+
+
+def evaluate(inventory, demand, upper=None, as_of=None, lead_time=DEFAULT_LEAD_TIME,
+             review_days=REVIEW_DAYS, safety_factor=SAFETY_FACTOR):
+    """
+    Days of cover, stock-out date, reorder point and reorder quantity for every
+    inventory row at once. demand is the [N, H] daily point forecast aligned with
+    inventory; upper is an optional high quantile of the same shape that sets
+    safety stock, picked for the service-level target (P90 ≈ 90% cycle service,
+    e.g. from lstm_model.mc_dropout_forecast). Returns inventory plus the computed columns and 'severity'
+    ('critical' = runs out before a new order can arrive, 'warning' = below the
+    reorder point, None = covered).
+    """
+    demand = np.maximum(np.asarray(demand, dtype=np.float64), 0)
+    n, horizon = demand.shape
+    on_hand = inventory["on_hand"].to_numpy(dtype=np.float64)
+    on_order = inventory["on_order"].to_numpy(dtype=np.float64) if "on_order" in inventory else np.zeros(n)
+    lead = (inventory["lead_time_days"].fillna(lead_time).to_numpy(dtype=np.int64)
+            if "lead_time_days" in inventory else np.full(n, lead_time, dtype=np.int64))
+    pack = (inventory["pack_size"].fillna(1).clip(lower=1).to_numpy(dtype=np.float64)
+            if "pack_size" in inventory else np.ones(n))
+    as_of = pd.Timestamp(as_of or pd.Timestamp.now()).normalize()
+
+    cum = np.cumsum(demand, axis=1)
+    rate = cum[:, -1] / horizon
+
+    # Whole days covered: rows of cum are non-decreasing, so a count is a row-wise searchsorted
+    covered = (cum <= on_hand[:, None]).sum(axis=1)
+    within = covered < horizon
+    k = np.minimum(covered, horizon - 1)
+    prev = np.where(k > 0, np.take_along_axis(cum, np.maximum(k - 1, 0)[:, None], axis=1)[:, 0], 0.0)
+    day_demand = np.take_along_axis(demand, k[:, None], axis=1)[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        beyond = np.where(rate > 0, horizon + (on_hand - cum[:, -1]) / rate, np.inf)
+        cover = np.where(within, k + (on_hand - prev) / np.where(day_demand > 0, day_demand, 1), beyond)
+
+    lead_demand = _cum_at(cum, lead)
+    if upper is not None:
+        safety = np.maximum(_cum_at(np.cumsum(np.asarray(upper, dtype=np.float64), axis=1), lead) - lead_demand, 0)
+    else:
+        safety = safety_factor * lead_demand
+    reorder_point = lead_demand + safety
+    target = _cum_at(cum, lead + review_days) + safety
+    position = on_hand + on_order
+    reorder_qty = np.ceil(np.maximum(target - position, 0) / pack) * pack
+
+    severity = np.full(n, None, dtype=object)
+    severity[position < reorder_point] = "warning"
+    severity[cover < lead] = "critical"
+    finite = np.isfinite(cover)
+    stockout = np.full(n, np.datetime64("NaT"), dtype="datetime64[D]")
+    stockout[finite] = np.datetime64(as_of.date()) + np.floor(cover[finite]).astype("timedelta64[D]")
+
+    return inventory.assign(
+        week_demand=cum[:, min(7, horizon) - 1],
+        lead_time_days=lead,
+        days_of_cover=np.round(cover, 2),
+        stockout_date=stockout,
+        reorder_point=np.round(reorder_point, 2),
+        reorder_qty=reorder_qty.astype(np.int64),
+        severity=severity,
+    )
+
+
+def to_alert_records(alerts, agent="PredictiveGuardian"):
+    """Alert dicts for alerts.json / the dashboard (only call on the rows being emitted)."""
+    records = []
+    for row in alerts.itertuples(index=False):
+        product = getattr(row, "product", row.sku)
+        stockout = "" if pd.isna(row.stockout_date) else f" on {pd.Timestamp(row.stockout_date).date()}"
+        if row.severity == "critical":
+            headline = f"{product} at {row.location} will RUN OUT in {row.days_of_cover:.1f} days{stockout}, " \
+                       f"before a new order can arrive ({row.lead_time_days}-day lead time)!"
+        else:
+            headline = f"{product} at {row.location} is below its reorder point " \
+                       f"({row.days_of_cover:.1f} days of cover{stockout})."
+        records.append({
+            "severity": row.severity,
+            "agent": agent,
+            "sku": row.sku,
+            "product": product,
+            "location": row.location,
+            "current_stock": int(row.on_hand),
+            "7day_demand": round(float(row.week_demand)),
+            "days_of_cover": float(row.days_of_cover),
+            "stockout_date": None if pd.isna(row.stockout_date) else str(pd.Timestamp(row.stockout_date).date()),
+            "lead_time_days": int(row.lead_time_days),
+            "reorder_qty": int(row.reorder_qty),
+            "message": f"{headline}\nCurrent: {int(row.on_hand)} → 7-day need: {round(float(row.week_demand))} → "
+                       f"REORDER {int(row.reorder_qty)} units!"
+        })
+    return records
+
+
+class AlertLedger:
+    """
+    Last emitted alert per (sku, location), persisted as Parquet. filter() keeps
+    only alerts that are new, escalated, have a stock-out date that moved earlier,
+    or were last sent more than renotify_hours ago; keys that no longer alert are
+    dropped so a recurrence is emitted again.
+    """
+
+    COLUMNS = ["sku", "location", "severity", "stockout_date", "emitted_at"]
+
+    def __init__(self, path=LEDGER_PATH, renotify_hours=24):
+        self.path = path
+        self.renotify = pd.Timedelta(hours=renotify_hours)
+        if path and os.path.exists(path):
+            self.ledger = pd.read_parquet(path)
+        else:
+            self.ledger = pd.DataFrame({c: pd.Series(dtype="object") for c in self.COLUMNS})
+
+    def filter(self, evaluated, now=None):
+        now = pd.Timestamp(now or pd.Timestamp.now())
+        active = evaluated[evaluated["severity"].notna()]
+        prev = self.ledger.rename(columns={"severity": "prev_severity", "stockout_date": "prev_stockout"})
+        merged = active.merge(prev, on=["sku", "location"], how="left")
+
+        is_new = merged["prev_severity"].isna().to_numpy()
+        escalated = (merged["severity"].map(SEVERITY_RANK).to_numpy()
+                     > merged["prev_severity"].map(SEVERITY_RANK).fillna(0).to_numpy())
+        earlier = (pd.to_datetime(merged["stockout_date"]) < pd.to_datetime(merged["prev_stockout"])).to_numpy()
+        stale = (now - pd.to_datetime(merged["emitted_at"]) > self.renotify).to_numpy()
+        emit = is_new | escalated | earlier | stale
+
+        emitted = merged.loc[emit, list(evaluated.columns)]
+        kept = merged.loc[~emit, ["sku", "location", "prev_severity", "prev_stockout", "emitted_at"]]
+        kept.columns = self.COLUMNS
+        fresh = emitted[["sku", "location", "severity", "stockout_date"]].assign(emitted_at=now)
+        parts = [part for part in (kept, fresh) if len(part)]
+        self.ledger = pd.concat(parts, ignore_index=True) if parts else fresh
+        return emitted.reset_index(drop=True)
+
+    def save(self):
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self.ledger.to_parquet(self.path, index=False)
+
+
+if __name__ == "__main__":
+    import json
+    import time
+
+    from forecast_writer import load_forecasts
+
+    parser = argparse.ArgumentParser(description="Stock-out alerts for every SKU-location")
+    parser.add_argument("--inventory", required=True, help="CSV/Parquet with sku, location, on_hand, ...")
+    parser.add_argument("--forecasts", required=True, help="Output of forecast_writer (.npy/.parquet/.jsonl/.json)")
+    parser.add_argument("--lead-times", default=None, help="Optional CSV/Parquet with sku, lead_time_days")
+    parser.add_argument("--ledger", default=LEDGER_PATH, help="Dedup ledger ('' disables deduplication)")
+    parser.add_argument("--renotify-hours", type=float, default=24)
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(LEDGER_PATH), "alerts.json"))
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    index, matrix = load_forecasts(args.forecasts)
+    inventory, demand = align_forecasts(index, matrix, load_inventory(args.inventory, args.lead_times))
+    evaluated = evaluate(inventory, demand)
+    ledger = AlertLedger(args.ledger or None, args.renotify_hours)
+    emitted = ledger.filter(evaluated)
+    ledger.save()
+    with open(args.out, "w") as f:
+        json.dump(to_alert_records(emitted), f, indent=2)
+    counts = evaluated["severity"].value_counts().to_dict()
+    print(f"Evaluated {len(evaluated)} SKU-locations in {time.perf_counter() - t0:.2f}s: {counts}; "
+          f"{len(emitted)} new alerts → {args.out}")
@@ -0,0 +1,302 @@
+# src/backtest.py — rolling-origin backtests of every Agent 2 forecaster (accuracy + cost)
+# Run with: python backtest.py --series 500 --models lstm rule hybrid --lstm-checkpoint ../models/lstm_backtest.pth
+#      or:  python backtest.py --series all --models rule prophet --workers 8
+#
+# Needs the converted store (python m5_store.py). Forecasts are cached per
+# (model, series, origin, horizon) in a SQLite file, so reruns only compute the missing pairs.
+#
+# The LSTM must not have seen the folds: train a checkpoint that stops before the earliest
+# origin (python train_lstm.py --train-end 1829 --out ../models/lstm_backtest.pth) and pass
+# --lstm-checkpoint. The shipped lstm_hybrid.pth saw d_1..d_1913, so it is refused unless
+# --allow-in-sample is given.
+import argparse
+import hashlib
+import logging
+import multiprocessing
+import os
+import resource
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from lstm_runtime import MODEL_PATH, SEQ_LEN, checkpoint_train_end
+from m5_store import STORE_DIR, M5Store, store_exists
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output", "backtest")
+BASE_MODELS = ("lstm", "rule", "prophet")
+
+# Per-worker state, set once by _init_worker
+_STORE = None
+_LSTM = None
+
+
+def model_tag(model, checkpoint=MODEL_PATH):
+    """Version tag stored with cached forecasts; a new tag invalidates old folds."""
+    if model == "lstm":
+        with open(checkpoint, "rb") as f:
+            return "lstm-" + hashlib.sha1(f.read()).hexdigest()[:12]
+    if model == "prophet":
+        import prophet
+        return "prophet-" + prophet.__version__
+    return "rule-v1"
+
+
+def _init_worker(store_dir, model, checkpoint=MODEL_PATH):
+    global _STORE, _LSTM
+    _STORE = M5Store(store_dir)
+    if model == "lstm":
+        import torch
+        from lstm_model import load_model
+        torch.set_num_threads(1)  # one process per core instead
+        _LSTM = load_model(checkpoint)
+    if model == "prophet":
+        logging.getLogger('cmdstanpy').disabled = True
+
+
+def _run_chunk(task):
+    """Forecasts every (series, origin) pair of one chunk. Returns rows for the cache + peak RSS."""
+    model, rows, folds, horizon = task
+    Y = _STORE.sales[rows].astype(np.float32)
+    out = []
+    for origin in folds:
+        if model == "lstm":
+            from lstm_model import batched_lstm_forecast
+            t0 = time.perf_counter()
+            preds = batched_lstm_forecast(_LSTM, Y[:, origin - SEQ_LEN:origin], steps=horizon)
+            per_series = (time.perf_counter() - t0) / len(rows)
+            out += [(r, origin, p, 0.0, per_series) for r, p in zip(rows, preds)]
+        elif model == "rule":
+            from baselines import rule_based_forecast
+            for r, y in zip(rows, Y):
+                np.random.seed((int(r) * 7919 + origin) & 0xffffffff)
+                t0 = time.perf_counter()
+                pred = rule_based_forecast(y[origin - SEQ_LEN:origin], steps=horizon)
+                out.append((r, origin, pred, 0.0, time.perf_counter() - t0))
+        else:
+            from m5_preprocess import to_prophet_frame
+            from prophet_baseline import ProphetForecaster
+            forecaster = ProphetForecaster()
+            dates = _STORE.dates
+            for r, y in zip(rows, Y):
+                t0 = time.perf_counter()
+                try:
+                    m = forecaster._fit_model(to_prophet_frame(y[:origin], dates))
+                    fit = time.perf_counter() - t0
+                    t0 = time.perf_counter()
+                    future = pd.DataFrame({'ds': pd.to_datetime(dates[origin:origin + horizon])})
+                    pred = np.maximum(m.predict(future)['yhat'].to_numpy(), 0.0)
+                    predict = time.perf_counter() - t0
+                except Exception:
+                    fit, predict, pred = time.perf_counter() - t0, 0.0, np.full(horizon, np.nan)
+                out.append((r, origin, pred, fit, predict))
+    return out, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+# ==========================================
+# CACHE
+# ==========================================
+def open_cache(path):
+    db = sqlite3.connect(path)
+    db.execute("""CREATE TABLE IF NOT EXISTS folds (
+        tag TEXT, series TEXT, origin INTEGER, horizon INTEGER,
+        forecast BLOB, fit_s REAL, predict_s REAL,
+        PRIMARY KEY (tag, series, origin, horizon))""")
+    db.execute("CREATE TABLE IF NOT EXISTS rss (tag TEXT PRIMARY KEY, peak_kb INTEGER)")
+    return db
+
+
+def cached_keys(db, tag, horizon):
+    return set(db.execute("SELECT series, origin FROM folds WHERE tag=? AND horizon=?", (tag, horizon)))
+
+
+def load_folds(db, tag, horizon, series_ids, folds):
+    """Returns forecasts [N, F, h], fit seconds [N, F], predict seconds [N, F]."""
+    pos = {s: i for i, s in enumerate(series_ids)}
+    fpos = {o: j for j, o in enumerate(folds)}
+    fc = np.full((len(series_ids), len(folds), horizon), np.nan, dtype=np.float32)
+    fit = np.zeros((len(series_ids), len(folds)))
+    pred = np.zeros((len(series_ids), len(folds)))
+    for s, o, blob, f, p in db.execute(
+            "SELECT series, origin, forecast, fit_s, predict_s FROM folds WHERE tag=? AND horizon=?",
+            (tag, horizon)):
+        if s in pos and o in fpos:
+            fc[pos[s], fpos[o]] = np.frombuffer(blob, dtype=np.float32)
+            fit[pos[s], fpos[o]], pred[pos[s], fpos[o]] = f, p
+    return fc, fit, pred
+
+
+# ==========================================
+# METRICS
+# ==========================================
+def score(train, actual, forecast):
+    """
+    Per-series MASE, sMAPE and RMSSE for forecasts [N, h] of actuals [N, h];
+    train [N, T] provides the naive one-step scale. Series with a zero scale get NaN.
+    """
+    diffs = np.diff(train, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mae_scale = np.abs(diffs).mean(axis=1)
+        mse_scale = (diffs ** 2).mean(axis=1)
+        err = forecast - actual
+        mase = np.abs(err).mean(axis=1) / mae_scale
+        rmsse = np.sqrt((err ** 2).mean(axis=1) / mse_scale)
+        denom = np.abs(actual) + np.abs(forecast)
+        smape = 200 * np.where(denom > 0, np.abs(err) / denom, 0.0).mean(axis=1)
+    bad = ~np.isfinite(mae_scale) | (mae_scale == 0)
+    mase[bad], rmsse[bad] = np.nan, np.nan
+    return mase, smape, rmsse
+
+
+def wrmsse(rmsse, weights):
+    """M5-style weighted RMSSE; weights are the units sold in the 28 days before the origin."""
+    ok = np.isfinite(rmsse)
+    w = weights[ok]
+    return float((rmsse[ok] * w).sum() / w.sum()) if w.sum() > 0 else float("nan")
+
+
+def check_out_of_sample(checkpoint, origins, total_days, allow_in_sample=False):
+    """Refuses (or, with allow_in_sample, warns) if the LSTM checkpoint was trained past the earliest origin."""
+    train_end = checkpoint_train_end(checkpoint)
+    if train_end is None:
+        # No train_lstm.py sidecar: assume it saw the whole store, like the shipped lstm_hybrid.pth
+        train_end = total_days
+    if train_end <= origins[0]:
+        return
+    msg = (f"{checkpoint} was trained on d_1..d_{train_end}, which covers the backtest origins "
+           f"{origins} — the LSTM folds would be in-sample. Train one with "
+           f"python train_lstm.py --train-end {origins[0]} --out <path> and pass --lstm-checkpoint <path>")
+    if not allow_in_sample:
+        raise ValueError(msg)
+    print(f"WARNING: {msg}")
+
+
+# ==========================================
+# DRIVER
+# ==========================================
+def run_backtest(series="500", models=("lstm", "rule", "hybrid"), folds=3, horizon=28,
+                 blends=(0.7,), workers=None, chunk_size=64, store_dir=STORE_DIR, out_dir=OUTPUT_DIR,
+                 lstm_checkpoint=MODEL_PATH, allow_in_sample=False):
+    if not store_exists(store_dir):
+        raise FileNotFoundError(f"No M5 store at {store_dir}; run python m5_store.py first")
+    os.makedirs(out_dir, exist_ok=True)
+    store = M5Store(store_dir)
+    ids = store.index['id'].to_numpy()
+    if series == "all":
+        rows = np.arange(len(ids))
+    else:
+        rows = np.random.default_rng(0).permutation(len(ids))[:int(series)]
+        rows.sort()
+    series_ids = [str(ids[r]) for r in rows]
+    T = store.sales.shape[1]
+    origins = [T - horizon * k for k in range(folds, 0, -1)]
+
+    base_needed = set(m for m in models if m in BASE_MODELS)
+    if "hybrid" in models:
+        base_needed |= {"lstm", "rule"}
+    if "lstm" in base_needed:
+        check_out_of_sample(lstm_checkpoint, origins, T, allow_in_sample)
+
+    db = open_cache(os.path.join(out_dir, "folds.sqlite"))
+    tags, peak_rss = {}, {}
+    ctx = multiprocessing.get_context("spawn")
+    for model in sorted(base_needed):
+        tag = tags[model] = model_tag(model, lstm_checkpoint)
+        done = cached_keys(db, tag, horizon)
+        # Group series by the origins they still miss, so a task only computes uncached pairs
+        missing = {}
+        for r in rows:
+            todo = tuple(o for o in origins if (str(ids[r]), o) not in done)
+            if todo:
+                missing.setdefault(todo, []).append(r)
+        n_todo = sum(len(rs) * len(todo) for todo, rs in missing.items())
+        print(f"[{model}] {len(rows) * len(origins) - n_todo} (series, origin) pairs cached, {n_todo} to backtest")
+        if missing:
+            tasks = [(model, rs[i:i + chunk_size], todo, horizon)
+                     for todo, rs in missing.items() for i in range(0, len(rs), chunk_size)]
+            peak = 0
+            with ctx.Pool(workers, initializer=_init_worker, initargs=(store_dir, model, lstm_checkpoint)) as pool:
+                for results, rss in pool.imap_unordered(_run_chunk, tasks):
+                    db.executemany("INSERT OR REPLACE INTO folds VALUES (?,?,?,?,?,?,?)", [
+                        (tag, str(ids[r]), int(o), horizon, np.asarray(p, np.float32).tobytes(), f, pr)
+                        for r, o, p, f, pr in results])
+                    db.commit()
+                    peak = max(peak, rss)
+            # Keep the largest peak seen: an incremental rerun over a few folds must not replace it
+            db.execute("INSERT INTO rss VALUES (?, ?) "
+                       "ON CONFLICT(tag) DO UPDATE SET peak_kb = max(peak_kb, excluded.peak_kb)", (tag, peak))
+            db.commit()
+        row = db.execute("SELECT peak_kb FROM rss WHERE tag=?", (tag,)).fetchone()
+        peak_rss[model] = row[0] / 1024 if row else float("nan")
+
+    Y = store.get_many(series_ids).astype(np.float64)
+    forecasts = {m: load_folds(db, tags[m], horizon, series_ids, origins) for m in base_needed}
+    for w in blends if "hybrid" in models else ():
+        fc_l, fit_l, pr_l = forecasts["lstm"]
+        fc_r, fit_r, pr_r = forecasts["rule"]
+        forecasts[f"hybrid_{w:g}"] = (w * fc_l + (1 - w) * fc_r, fit_l + fit_r, pr_l + pr_r)
+        peak_rss[f"hybrid_{w:g}"] = max(peak_rss["lstm"], peak_rss["rule"])
+
+    table = []
+    for name, (fc, fit, pred) in forecasts.items():
+        if name not in models and not name.startswith("hybrid_"):
+            continue
+        mase, smape, wrm = [], [], []
+        for j, origin in enumerate(origins):
+            train, actual = Y[:, :origin], Y[:, origin:origin + horizon]
+            m, s, r = score(train, actual, fc[:, j].astype(np.float64))
+            mase.append(m)
+            smape.append(s)
+            wrm.append(wrmsse(r, train[:, -28:].sum(axis=1)))
+        table.append({
+            "model": name,
+            "series": len(series_ids),
+            "folds": len(origins),
+            "WRMSSE": round(float(np.nanmean(wrm)), 4),
+            "MASE": round(float(np.nanmean(np.concatenate(mase))), 4),
+            "sMAPE": round(float(np.nanmean(np.concatenate(smape))), 2),
+            "fit_s_per_series": round(float(fit.mean()), 4),
+            "predict_ms_per_series": round(float(pred.mean() * 1000), 3),
+            "peak_rss_mb": round(peak_rss[name], 1),
+        })
+
+    result = pd.DataFrame(table).sort_values("WRMSSE").reset_index(drop=True)
+    result.to_csv(os.path.join(out_dir, "comparison.csv"), index=False)
+    with open(os.path.join(out_dir, "comparison.md"), "w") as f:
+        f.write(result.to_markdown(index=False) if _has_tabulate() else result.to_string(index=False))
+    return result
+
+
+def _has_tabulate():
+    try:
+        import tabulate  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the Agent 2 forecasters")
+    parser.add_argument("--series", default="500", help="Number of random series, or 'all'")
+    parser.add_argument("--models", nargs="+", default=["lstm", "rule", "hybrid"],
+                        choices=list(BASE_MODELS) + ["hybrid"])
+    parser.add_argument("--folds", type=int, default=3, help="Rolling origins, one horizon apart")
+    parser.add_argument("--horizon", type=int, default=28)
+    parser.add_argument("--blend", type=float, nargs="+", default=[0.7],
+                        help="LSTM weights to evaluate for the hybrid (rule gets 1 - w)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=64, help="Series per worker task")
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    parser.add_argument("--out", default=OUTPUT_DIR)
+    parser.add_argument("--lstm-checkpoint", default=MODEL_PATH,
+                        help="LSTM state dict trained before the earliest origin (train_lstm.py --train-end)")
+    parser.add_argument("--allow-in-sample", action="store_true",
+                        help="Score an LSTM checkpoint whose training range covers the origins (warns)")
+    args = parser.parse_args()
+
+    result = run_backtest(args.series, args.models, args.folds, args.horizon, args.blend,
+                          args.workers, args.chunk_size, args.store_dir, args.out,
+                          args.lstm_checkpoint, args.allow_in_sample)
+    print(result.to_string(index=False))
+    print(f"\nComparison table written to {args.out}/comparison.csv")
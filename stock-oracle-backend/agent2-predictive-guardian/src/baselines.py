@@ -0,0 +1,67 @@
+# src/baselines.py — cheap rule-based forecasters (the Vision fallback tier)
+import numpy as np
+
+WEEKLY_AMP, MONTHLY_AMP, NOISE_STD = 25, 15, 8
+
+
+# Rule-based seasonality (your Vision fallback)
+def rule_based_forecast(last_60, steps=30):
+    trend = np.polyfit(range(len(last_60)), last_60, 1)
+    base = np.polyval(trend, range(len(last_60), len(last_60)+steps))
+    seasonal = 25 * np.sin(2 * np.pi * np.arange(steps) / 7) + 15 * np.sin(2 * np.pi * np.arange(steps) / 30.5)
+    noise = np.random.normal(0, 8, steps)
+    return np.maximum(base + seasonal + noise, 1)
+
+
+def linear_trend(history):
+    """Closed-form least-squares (slope, intercept) of every row of [N, T] against 0..T-1."""
+    y = np.asarray(history, dtype=np.float64)
+    t = np.arange(y.shape[1], dtype=np.float64)
+    t_mean = t.mean()
+    y_mean = y.mean(axis=1)
+    slope = (y - y_mean[:, None]) @ (t - t_mean) / ((t - t_mean) ** 2).sum()
+    return slope, y_mean - slope * t_mean
+
+
+def rule_based_forecast_matrix(history, steps=30, window=60, rng=None, noise=True):
+    """
+    rule_based_forecast for a whole catalog: [N, T] history → [N, steps] forecasts.
+    Fits on the last `window` days of every row in one pass; rng is a seed or a
+    np.random.Generator (noise=False gives the deterministic trend + seasonality).
+    """
+    history = np.asarray(history)[:, -window:]
+    n, length = history.shape
+    slope, intercept = linear_trend(history)
+    future_t = np.arange(length, length + steps, dtype=np.float64)
+    base = intercept[:, None] + slope[:, None] * future_t
+    days = np.arange(steps)
+    seasonal = WEEKLY_AMP * np.sin(2 * np.pi * days / 7) + MONTHLY_AMP * np.sin(2 * np.pi * days / 30.5)
+    out = base + seasonal
+    if noise:
+        out += np.random.default_rng(rng).normal(0, NOISE_STD, (n, steps))
+    return np.maximum(out, 1, out=out)
+
+
+def weekly_profile_forecast_matrix(history, steps=30, window=56):
+    """
+    Scale-free cheap forecast for [N, T] rows (items or aggregates alike): linear
+    trend over the last `window` days plus each weekday's mean deviation from it.
+    Deterministic; window should be a multiple of 7.
+    """
+    history = np.asarray(history, dtype=np.float64)[:, -window:]
+    length = history.shape[1]
+    slope, intercept = linear_trend(history)
+    t = np.arange(length)
+    resid = history - (intercept[:, None] + slope[:, None] * t)
+    profile = np.stack([resid[:, t % 7 == d].mean(axis=1) for d in range(7)], axis=1)
+    future_t = np.arange(length, length + steps)
+    out = intercept[:, None] + slope[:, None] * future_t + profile[:, future_t % 7]
+    return np.maximum(out, 0, out=out)
+
+
+def fallback_forecast_matrix(n, steps=30, rng=None):
+    """The ProphetForecaster fallback curve for n series at once → [n, steps]."""
+    days = np.arange(steps)
+    curve = 25.0 + 0.8 * days + np.sin(days / 3.5) * 12
+    noise = np.random.default_rng(rng).normal(0, 4, (n, steps))
+    return np.maximum(curve + noise, 5)
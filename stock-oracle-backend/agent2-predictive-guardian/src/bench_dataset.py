@@ -0,0 +1,82 @@
+# src/bench_dataset.py — linear-scan dataset vs M5WindowDataset (+ DataLoader workers)
+# Run with: python bench_dataset.py [--series 100 3000 30000] [--workers 0 4]
+import argparse
+import time
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+from m5_dataset import SEQ_LEN, M5WindowDataset, make_loader
+
+
+class LinearScanDataset(Dataset):
+    """The previous train_lstm.M5Dataset: walks every series to locate idx (baseline)."""
+
+    def __init__(self, series_list):
+        self.series = [s.astype(np.float32) for s in series_list]
+
+    def __len__(self):
+        return sum(len(s) - SEQ_LEN - 1 for s in self.series)
+
+    def __getitem__(self, idx):
+        for s in self.series:
+            if idx < len(s) - SEQ_LEN - 1:
+                x = s[idx:idx + SEQ_LEN]
+                y = s[idx + SEQ_LEN]
+                return torch.from_numpy(x).unsqueeze(-1), torch.tensor(y).unsqueeze(-1)
+            idx -= len(s) - SEQ_LEN - 1
+        raise IndexError
+
+
+def random_access_rate(dataset, n_samples, seed=0):
+    idx = np.random.default_rng(seed).integers(0, len(dataset), n_samples)
+    t0 = time.perf_counter()
+    for i in idx:
+        dataset[int(i)]
+    return n_samples / (time.perf_counter() - t0)
+
+
+def loader_rate(dataset, batch_size, num_workers, n_batches):
+    loader = make_loader(dataset, batch_size=batch_size, shuffle=True, num_workers=num_workers)
+    it = iter(loader)
+    next(it)  # exclude worker start-up
+    t0 = time.perf_counter()
+    seen = 0
+    for _ in range(n_batches):
+        try:
+            x, _ = next(it)
+        except StopIteration:
+            break
+        seen += len(x)
+    return seen / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark M5 windowed datasets")
+    parser.add_argument("--series", type=int, nargs="+", default=[100, 3000, 30000])
+    parser.add_argument("--length", type=int, default=1913, help="Days per series (M5: 1913)")
+    parser.add_argument("--samples", type=int, default=20000, help="Random __getitem__ calls per dataset")
+    parser.add_argument("--baseline-samples", type=int, default=500,
+                        help="Random calls for the (slow) linear-scan baseline")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 4])
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--batches", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    loader_cols = "".join(f" | {'loader w=' + str(w):>12}" for w in args.workers)
+    print(f"{'series':>7} | {'linear scan/s':>13} | {'windowed/s':>11}{loader_cols}")
+    print("-" * (38 + 15 * len(args.workers)))
+    for n in args.series:
+        series_list = [rng.poisson(5, args.length).astype(np.float32) for _ in range(n)]
+        baseline = random_access_rate(LinearScanDataset(series_list), args.baseline_samples)
+        dataset = M5WindowDataset(series_list)
+        windowed = random_access_rate(dataset, args.samples)
+        loaders = "".join(f" | {loader_rate(dataset, args.batch_size, w, args.batches):>12.0f}"
+                          for w in args.workers)
+        print(f"{n:>7} | {baseline:>13.0f} | {windowed:>11.0f}{loaders}")
+
+
+if __name__ == "__main__":
+    main()
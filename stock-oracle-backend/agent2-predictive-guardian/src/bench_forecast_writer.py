@@ -0,0 +1,80 @@
+# src/bench_forecast_writer.py — legacy json.dump(indent=2) vs the streaming forecast writers
+# Run with: python bench_forecast_writer.py [--skus 50000] [--horizon 30] [--batch 1024]
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from forecast_writer import FORMATS, load_forecasts, make_writer
+
+
+def legacy_dump(out_dir, rows, predictions):
+    """What hybrid_ensemble.py used to do: one dict per SKU-day, pretty-printed at the end."""
+    forecasts = []
+    for row, pred in zip(rows, predictions):
+        for i, val in enumerate(pred):
+            forecasts.append({
+                "sku": row["sku"], "product": row["product"], "location": row["location"],
+                "day": i+1, "predicted_demand": round(float(val), 2)
+            })
+    path = os.path.join(out_dir, "forecasts.json")
+    with open(path, "w") as f:
+        json.dump(forecasts, f, indent=2)
+    return [path]
+
+
+def streamed(fmt, out_dir, rows, predictions, batch):
+    with make_writer(fmt, out_dir, total=len(rows), horizon=predictions.shape[1]) as writer:
+        for start in range(0, len(rows), batch):
+            writer.write_batch(rows[start:start + batch], predictions[start:start + batch])
+    path = writer.path
+    return [path, path.replace(".npy", "_index.parquet")] if fmt == "npy" else [path]
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    paths = fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, sum(os.path.getsize(p) for p in paths), paths[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark forecast output formats")
+    parser.add_argument("--skus", type=int, default=50000)
+    parser.add_argument("--horizon", type=int, default=30)
+    parser.add_argument("--batch", type=int, default=1024, help="SKUs per write_batch call")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    rows = [{"sku": f"SKU-{i:06d}", "product": f"Product {i}", "location": f"Rack {i % 97}"}
+            for i in range(args.skus)]
+    predictions = rng.gamma(2.0, 20.0, (args.skus, args.horizon)).astype(np.float32)
+
+    print(f"{args.skus} SKUs x {args.horizon} days, batches of {args.batch}\n")
+    print(f"{'format':>15} | {'write s':>8} | {'peak MB':>8} | {'size MB':>8} | {'load s':>7}")
+    print("-" * 59)
+    cases = [("legacy indent=2", lambda d: legacy_dump(d, rows, predictions))]
+    cases += [(fmt, lambda d, fmt=fmt: streamed(fmt, d, rows, predictions, args.batch)) for fmt in FORMATS]
+    for name, fn in cases:
+        out_dir = tempfile.mkdtemp()
+        try:
+            elapsed, peak, size, path = measure(lambda: fn(out_dir))
+            t0 = time.perf_counter()
+            _, matrix = load_forecasts(path)
+            np.asarray(matrix[-1])
+            load = time.perf_counter() - t0
+        finally:
+            shutil.rmtree(out_dir)
+        print(f"{name:>15} | {elapsed:>8.2f} | {peak / 2**20:>8.1f} | {size / 2**20:>8.1f} | {load:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# src/bench_lstm_batch.py — per-SKU lstm_forecast loop vs batched_lstm_forecast
+# Run with: python bench_lstm_batch.py [--skus 100 1000 10000]
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from lstm_model import batched_lstm_forecast, load_model, lstm_forecast
+
+
+def make_histories(n, seed=0):
+    """Same M5-style synthetic 60-day histories as hybrid_ensemble."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(60)
+    base = 80 + 0.05 * t + 30 * np.sin(2 * np.pi * t / 7)
+    return np.maximum(10, base + rng.normal(0, 15, (n, 60))).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched multi-SKU LSTM inference")
+    parser.add_argument("--skus", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    parser.add_argument("--loop-limit", type=int, default=200,
+                        help="Time the per-SKU loop on at most this many SKUs and extrapolate")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model = load_model()
+
+    print(f"{'SKUs':>7} | {'loop SKU/s':>10} | {'batched SKU/s':>13} | {'stateful SKU/s':>14} | "
+          f"{'max |diff| exact':>16} | {'max |diff| stateful':>19}")
+    print("-" * 96)
+    for n in args.skus:
+        histories = make_histories(n)
+
+        m = min(n, args.loop_limit)
+        t0 = time.perf_counter()
+        loop = np.stack([lstm_forecast(model, h) for h in histories[:m]])
+        loop_rate = m / (time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        exact = batched_lstm_forecast(model, histories, chunk_size=args.chunk_size)
+        exact_rate = n / (time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        stateful = batched_lstm_forecast(model, histories, chunk_size=args.chunk_size, stateful=True)
+        stateful_rate = n / (time.perf_counter() - t0)
+
+        print(f"{n:>7} | {loop_rate:>10.0f} | {exact_rate:>13.0f} | {stateful_rate:>14.0f} | "
+              f"{np.abs(exact[:m] - loop).max():>16.2e} | {np.abs(stateful[:m] - loop).max():>19.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# src/bench_lstm_export.py — eager fp32 vs exported TorchScript / ONNX Runtime (fp32 + int8)
+# Run with: python lstm_export.py && python bench_lstm_export.py [--skus 1000] [--threads 1]
+import argparse
+import os
+import time
+import warnings
+
+import numpy as np
+import torch
+
+from bench_lstm_batch import make_histories
+from lstm_export import quantize
+from lstm_model import MODEL_PATH, batched_lstm_forecast, load_model
+from lstm_runtime import MODELS_DIR, ExportedForecaster
+
+
+def latency_ms(fn, histories, reps):
+    fn(histories)  # warm-up
+    times = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn(histories)
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark exported LSTM forecasters")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--skus", type=int, default=1000, help="Batch size for the throughput run")
+    parser.add_argument("--reps", type=int, default=20, help="Single-SKU latency repetitions")
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=FutureWarning)  # torch.jit deprecation notices
+    torch.set_num_threads(args.threads)
+    name = os.path.splitext(os.path.basename(MODEL_PATH))[0]
+    eager = load_model()
+    eager_int8 = quantize(load_model())
+    candidates = [
+        ("eager fp32", MODEL_PATH, lambda h: batched_lstm_forecast(eager, h)),
+        ("eager int8", None, lambda h: batched_lstm_forecast(eager_int8, h)),
+    ]
+    for label, suffix in [("torchscript fp32", ".ts.pt"), ("torchscript int8", ".int8.ts.pt"),
+                          ("onnxruntime fp32", ".onnx"), ("onnxruntime int8", ".int8.onnx")]:
+        path = os.path.join(args.models_dir, name + suffix)
+        if not os.path.exists(path):
+            print(f"skipping {label}: {path} not found (run python lstm_export.py)")
+            continue
+        candidates.append((label, path, ExportedForecaster(path, threads=args.threads)))
+
+    one = make_histories(1)
+    many = make_histories(args.skus)
+    reference = batched_lstm_forecast(eager, many)
+    print(f"{args.threads} thread(s); latency = 1 SKU x 30 days, throughput = {args.skus} SKUs\n")
+    print(f"{'runtime':>17} | {'size MB':>7} | {'latency ms':>10} | {'SKU/s':>8} | {'speedup':>7} | {'mean rel err':>12}")
+    print("-" * 78)
+    base = None
+    for label, path, fn in candidates:
+        lat = latency_ms(fn, one, args.reps)
+        t0 = time.perf_counter()
+        preds = fn(many)
+        rate = args.skus / (time.perf_counter() - t0)
+        base = base or rate
+        err = np.abs(preds - reference).mean() / np.abs(reference).mean()
+        size = f"{os.path.getsize(path) / 2**20:7.2f}" if path else f"{'-':>7}"
+        print(f"{label:>17} | {size} | {lat:>10.2f} | {rate:>8.0f} | {rate / base:>6.2f}x | {err:>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# src/bench_mc_dropout.py — cost of P10/P50/P90 bands: K batched passes vs one [N*K] batch, exact vs stateful
+# Run with: python bench_mc_dropout.py [--skus 200] [--samples 8 16] [--stateful]
+#
+# Also checks that the centred bands contain the point forecast from the same recurrence
+# (P10 <= point <= P90 on every SKU-day, no clamping); exits non-zero if they do not.
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from lstm_model import batched_lstm_forecast, load_model, mc_dropout_forecast
+
+
+def repeat_batch(model, histories, samples, steps, stateful):
+    """Alternative: every SKU repeated K times in one [N*K] batch with dropout on, quantiles at the end."""
+    model.lstm.train()
+    try:
+        paths = batched_lstm_forecast(model, np.repeat(histories, samples, axis=0), steps=steps,
+                                      chunk_size=len(histories) * samples, stateful=stateful)
+    finally:
+        model.lstm.eval()
+    paths = paths.reshape(len(histories), samples, steps)
+    return np.quantile(paths, (0.1, 0.5, 0.9), axis=1).transpose(1, 0, 2)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Monte Carlo dropout forecasting")
+    parser.add_argument("--skus", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=30)
+    parser.add_argument("--samples", type=int, nargs="+", default=[8, 16])
+    parser.add_argument("--stateful", action="store_true", help="Point forecast and paths on the (h, c) recurrence")
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model = load_model()
+    histories = np.random.default_rng(0).gamma(2.0, 20.0, (args.skus, 60)).astype(np.float32)
+
+    point, point_pred = timed(lambda: batched_lstm_forecast(model, histories, steps=args.steps,
+                                                            stateful=args.stateful))
+    print(f"{args.skus} SKUs x {args.steps} days, {torch.get_num_threads()} threads")
+    label = f"point forecast ({'stateful' if args.stateful else 'exact'})"
+    print(f"  {label:<29}: {point:7.2f} s")
+    ok = True
+    for k in args.samples:
+        batched, _ = timed(lambda: repeat_batch(model, histories, k, args.steps, args.stateful))
+        loops, raw = timed(lambda: mc_dropout_forecast(model, histories, steps=args.steps, samples=k,
+                                                       stateful=args.stateful, seed=0))
+        q = mc_dropout_forecast(model, histories, steps=args.steps, samples=k, stateful=args.stateful, seed=0,
+                                center=point_pred)
+        width = float(np.mean(q[:, 2] - q[:, 0]))
+        drift = float(np.mean(np.abs(raw[:, 1] - point_pred) / point_pred))
+        inside = (q[:, 0] <= point_pred) & (point_pred <= q[:, 2])
+        ok &= bool(inside.all())
+        print(f"  K={k:<3} one [N*K] batch        : {batched:7.2f} s")
+        print(f"  K={k:<3} mc_dropout_forecast    : {loops:7.2f} s  ({loops / point:.1f}x point, "
+              f"mean P10-P90 width {width:.1f})")
+        print(f"        raw P50 vs point {drift:.1%}, raw P90 below point {np.mean(raw[:, 2] < point_pred):.1%}; "
+              f"centred bands contain the point on {inside.mean():.1%} of SKU-days")
+    if not ok:
+        raise SystemExit("P10 <= point <= P90 violated")
+
+if __name__ == "__main__":
+    main()
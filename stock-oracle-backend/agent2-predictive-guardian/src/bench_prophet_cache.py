@@ -0,0 +1,65 @@
+# src/bench_prophet_cache.py — daily Prophet refresh: cold refit vs the fitted-model cache (hit / warm start)
+# Run with: python m5_store.py && python bench_prophet_cache.py [--series 20] [--new-days 1]
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from m5_preprocess import to_prophet_frame
+from m5_store import STORE_DIR, M5Store, store_exists
+from prophet_baseline import MIN_HISTORY, ProphetForecaster
+from prophet_cache import ProphetModelCache
+
+
+def timed_fits(forecaster, frames, keys, horizon):
+    """Seconds per series and the [N, horizon] forecasts for one pass over the fleet."""
+    preds, t0 = [], time.perf_counter()
+    for df, key in zip(frames, keys):
+        m = forecaster._fit_model(df, key)
+        future = pd.DataFrame({'ds': pd.date_range(df['ds'].iloc[-1] + pd.Timedelta(days=1), periods=horizon)})
+        preds.append(np.maximum(m.predict(future)['yhat'].to_numpy(), 0.0))
+    return (time.perf_counter() - t0) / len(frames), np.array(preds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Prophet fitted-model cache")
+    parser.add_argument("--series", type=int, default=20)
+    parser.add_argument("--new-days", type=int, default=1, help="Days that arrive between refreshes")
+    parser.add_argument("--horizon", type=int, default=30)
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    args = parser.parse_args()
+
+    if not store_exists(args.store_dir):
+        sys.exit(f"No converted store at {args.store_dir} (run python m5_store.py first)")
+    logging.getLogger('cmdstanpy').disabled = True
+    store = M5Store(args.store_dir)
+    busy = np.flatnonzero((np.asarray(store.sales) > 0).sum(axis=1) >= MIN_HISTORY + 200)[:args.series]
+    keys = list(store.index['id'].iloc[busy])
+    today = [to_prophet_frame(np.asarray(store.sales[r], dtype=np.float64), store.dates) for r in busy]
+    yesterday = [df.iloc[:-args.new_days] for df in today]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ProphetModelCache(os.path.join(tmp, "cache.sqlite"))
+        cached = ProphetForecaster(cache=cache)
+        timed_fits(cached, yesterday, keys, args.horizon)  # yesterday's refresh fills the cache
+        cold, cold_preds = timed_fits(ProphetForecaster(), today, keys, args.horizon)
+        warm, warm_preds = timed_fits(cached, today, keys, args.horizon)
+        hit, _ = timed_fits(cached, today, keys, args.horizon)  # nothing new since: pure reuse
+        stats = cache.stats()
+
+    diff = np.abs(warm_preds - cold_preds).mean() / np.abs(cold_preds).mean()
+    print(f"{len(keys)} M5 series, {args.new_days} new day(s) per refresh, {args.horizon}-day forecasts")
+    print(f"  cold refit           : {cold:7.3f} s/series")
+    print(f"  warm start (cached)  : {warm:7.3f} s/series  ({cold / warm:.1f}x), "
+          f"forecast mean rel diff vs cold {diff:.2e}")
+    print(f"  unchanged (hit)      : {hit:7.3f} s/series  ({cold / hit:.1f}x)")
+    print(f"  cache                : {stats}")
+
+
+if __name__ == "__main__":
+    main()
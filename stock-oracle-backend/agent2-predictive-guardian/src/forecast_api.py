@@ -0,0 +1,356 @@
+# src/forecast_api.py — Agent 2 forecast service: LSTM loaded once, cached per-SKU forecasts + alerts
+# Run with: uvicorn forecast_api:app --port 8001                      (from src/, demo catalog)
+#      or:  FORECAST_CATALOG=m5 FORECAST_TTL_S=600 uvicorn forecast_api:app --port 8001
+#
+# GET  /forecast/{sku}   30-day hybrid forecast (cache hit: no model call)
+# GET  /alerts           run-out alerts for the whole catalog (a background sweep keeps them fresh)
+# POST /sales/{sku}      append new daily sales → only that SKU is recomputed
+# GET  /cache/stats      hit / miss / eviction counters
+# GET  /metrics          Prometheus text: stage timings, request latency, cache gauges
+# GET  /health           liveness + whether the first sweep is done; the model is loaded
+#                        in the app lifespan, so importing this module does not import torch
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+
+from alerting import DEFAULT_LEAD_TIME, evaluate, to_alert_records
+from baselines import NOISE_STD, rule_based_forecast_matrix
+from lstm_runtime import MODEL_PATH, SEQ_LEN
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+from instrumentation import metrics, stage
+
+HORIZON = 30
+LSTM_WEIGHT = 0.7  # Hybrid = 70% LSTM + 30% Rule-Based (same blend as hybrid_ensemble.py)
+CACHE_TTL_S = float(os.environ.get("FORECAST_TTL_S", "300"))
+# Background sweep period: recomputes the expired SKUs so /alerts never computes in-request
+REFRESH_S = float(os.environ.get("FORECAST_REFRESH_S", str(CACHE_TTL_S / 2)))
+CACHE_SIZE = int(os.environ.get("FORECAST_CACHE_SIZE", "50000"))
+CATALOG = os.environ.get("FORECAST_CATALOG", "demo")  # 'demo' or 'm5' (needs the M5 store)
+BATCH_SIZE = 1024  # SKUs per batched LSTM pass when refreshing many at once
+# P10/P90 bands: MC dropout paths per SKU, each about one point forecast (0 = off, the default).
+# FORECAST_STATEFUL=1 runs point forecast and paths on the (h, c) recurrence: ~10x cheaper per
+# path than the exact window, so FORECAST_STATEFUL=1 FORECAST_MC_SAMPLES=8 costs less than one
+# exact point forecast
+MC_SAMPLES = int(os.environ.get("FORECAST_MC_SAMPLES", "0"))
+STATEFUL = os.environ.get("FORECAST_STATEFUL", "0") == "1"
+
+DEMO_PRODUCTS = [
+    {"sku": "STEEL-001",  "name": "Steel Sheets",      "location": "Rack B2"},
+    {"sku": "CHAIR-001",  "name": "Office Chair",      "location": "Warehouse A"},
+    {"sku": "CEMENT-001", "name": "Cement Bags",       "location": "Dock 3"},
+    {"sku": "PAINT-001",  "name": "Industrial Paint",  "location": "Chemical Zone"},
+]
+
+
+def _seed(sku):
+    # Stable across processes (hash() is salted per run)
+    return zlib.crc32(sku.encode())
+
+
+class TTLCache:
+    """LRU-bounded map whose entries also expire after ttl seconds; both read as misses."""
+
+    def __init__(self, max_size=50000, ttl=300.0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self.hits = self.misses = self.expired = self.evictions = 0
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is not None and self.clock() >= entry[1]:
+            del self._data[key]
+            self.expired += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value):
+        self._data[key] = (value, self.clock() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key):
+        self._data.pop(key, None)
+
+    def __contains__(self, key):
+        """Fresh entry present? A peek: no hit / miss / expiry accounting, no LRU bump."""
+        entry = self._data.get(key)
+        return entry is not None and self.clock() < entry[1]
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"size": len(self._data), "max_size": self.max_size, "ttl_s": self.ttl,
+                "hits": self.hits, "misses": self.misses, "expired": self.expired,
+                "evictions": self.evictions}
+
+
+def load_catalog(kind=CATALOG):
+    """sku -> {sku, product, location, current_stock, history (last SEQ_LEN days)}."""
+    catalog = {}
+    if kind == "m5":
+        from m5_store import get_store
+        store = get_store()
+        histories = np.asarray(store.sales[:, -SEQ_LEN:], dtype=np.float32)
+        stocks = np.random.default_rng(0).integers(70, 140, len(histories))
+        index = store.index
+        for row, (sku, item_id, store_id) in enumerate(zip(index['id'], index['item_id'], index['store_id'])):
+            catalog[sku] = {"sku": sku, "product": item_id, "location": store_id,
+                            "current_stock": int(stocks[row]), "history": histories[row]}
+        return catalog
+    for p in DEMO_PRODUCTS:
+        # Same M5-style synthetic last 60 days as hybrid_ensemble.py, seeded per SKU
+        rng = np.random.default_rng(_seed(p["sku"]))
+        days = np.arange(SEQ_LEN)
+        history = np.maximum(10, 80 + 0.05 * days + 30 * np.sin(2 * np.pi * days / 7) + rng.normal(0, 15, SEQ_LEN))
+        catalog[p["sku"]] = {"sku": p["sku"], "product": p["name"], "location": p["location"],
+                             "current_stock": int(rng.integers(70, 140)), "history": history.astype(np.float32)}
+    return catalog
+
+
+class ForecastService:
+    """
+    Owns the model, the catalog and the caches. Forecasts are computed in
+    batches for whatever is missing or stale; everything else is a dict read.
+    """
+
+    def __init__(self, model, catalog, ttl=CACHE_TTL_S, max_size=CACHE_SIZE):
+        self.model = model
+        self.catalog = catalog
+        self.cache = TTLCache(max_size, ttl)
+        self.alerts = {}  # sku -> alert, updated whenever a SKU is recomputed
+        self.alerts_refreshed = None  # monotonic time of the last full sweep
+        self.recomputed = 0
+        self.lock = threading.Lock()
+
+    @stage("forecast_compute")
+    def _compute(self, skus):
+        from lstm_model import batched_lstm_forecast, mc_dropout_forecast
+        items = [self.catalog[s] for s in skus]
+        histories = np.stack([it["history"] for it in items])
+        for start in range(0, len(items), BATCH_SIZE):
+            chunk, hist = items[start:start + BATCH_SIZE], histories[start:start + BATCH_SIZE]
+            lstm = batched_lstm_forecast(self.model, hist, steps=HORIZON, chunk_size=BATCH_SIZE, stateful=STATEFUL)
+            rule = rule_based_forecast_matrix(hist, steps=HORIZON, noise=False)
+            # Per-SKU seeded noise keeps a SKU's forecast identical however it is batched
+            rule = np.maximum(rule + np.stack([
+                np.random.default_rng(_seed(it["sku"])).normal(0, NOISE_STD, HORIZON) for it in chunk
+            ]), 1)
+            hybrid = np.maximum(LSTM_WEIGHT * lstm + (1 - LSTM_WEIGHT) * rule, 1)
+            lower = upper = None
+            if MC_SAMPLES > 0:
+                # Paths on the point forecast's recurrence, centred on it: lower <= hybrid <= upper as is
+                q = mc_dropout_forecast(self.model, hist, steps=HORIZON, samples=MC_SAMPLES, chunk_size=BATCH_SIZE,
+                                        stateful=STATEFUL, seed=0, center=lstm)
+                lower, upper = (np.maximum(LSTM_WEIGHT * q[:, i] + (1 - LSTM_WEIGHT) * rule, 1) for i in (0, 2))
+            generated_at = datetime.now().isoformat(timespec="seconds")
+            for i, (item, pred) in enumerate(zip(chunk, hybrid)):
+                self.cache.put(item["sku"], {
+                    "sku": item["sku"], "product": item["product"], "location": item["location"],
+                    "current_stock": item["current_stock"],
+                    "predicted_demand": [round(float(v), 2) for v in pred],
+                    "lower": None if lower is None else [round(float(v), 2) for v in lower[i]],
+                    "upper": None if upper is None else [round(float(v), 2) for v in upper[i]],
+                    "generated_at": generated_at,
+                })
+                self.alerts.pop(item["sku"], None)
+            inventory = pd.DataFrame({
+                "sku": [it["sku"] for it in chunk], "product": [it["product"] for it in chunk],
+                "location": [it["location"] for it in chunk], "on_hand": [it["current_stock"] for it in chunk],
+                "lead_time_days": [it.get("lead_time_days", DEFAULT_LEAD_TIME) for it in chunk],
+            })
+            evaluated = evaluate(inventory, hybrid, upper=upper)
+            for alert in to_alert_records(evaluated[evaluated["severity"].notna()]):
+                self.alerts[alert["sku"]] = alert
+            self.recomputed += len(chunk)
+        metrics.inc("skus_recomputed", len(skus))
+
+    def forecast(self, sku):
+        with self.lock:
+            if sku not in self.catalog:
+                raise KeyError(sku)
+            cached = self.cache.get(sku)
+            if cached is None:
+                self._compute([sku])
+                cached = self.cache.get(sku)
+            return cached
+
+    def refresh_alerts(self):
+        """
+        Recomputes (batched) only the SKUs whose forecasts are missing or expired.
+        The lock is taken per batch, so requests are served in between during a
+        long sweep (e.g. the first one over the M5 catalog).
+        """
+        with self.lock:
+            now = time.monotonic()
+            stale = [s for s in self.catalog if s not in self.cache]
+        for start in range(0, len(stale), BATCH_SIZE):
+            with self.lock:
+                # Requests may have filled some of these since the scan
+                batch = [s for s in stale[start:start + BATCH_SIZE] if s not in self.cache]
+                if batch:
+                    self._compute(batch)
+        with self.lock:
+            self.alerts_refreshed = now
+
+    def run_refresher(self, stop, interval=REFRESH_S):
+        """Sweeps now, then every interval seconds until stop is set (the refresher thread's target)."""
+        while True:
+            try:
+                self.refresh_alerts()
+            except Exception as err:  # keep serving the last alerts, retry next tick
+                print(f"Alert refresh failed: {err!r}")
+            if stop.wait(interval):
+                return
+
+    def all_alerts(self):
+        """The current alerts as a dict read; the refresher thread keeps them up to date."""
+        with self.lock:
+            return list(self.alerts.values())
+
+    def add_sales(self, sku, sales, current_stock=None, product=None, location=None, lead_time_days=None):
+        """Appends new daily sales (creating the SKU if needed) and recomputes just that SKU."""
+        sales = np.asarray(sales, dtype=np.float32)
+        with self.lock:
+            item = self.catalog.get(sku)
+            if item is None:
+                # New SKU: pad a short history with its mean so the 60-day window is full
+                item = self.catalog[sku] = {"sku": sku, "product": product or sku, "location": location or "unknown",
+                                            "current_stock": 0,
+                                            "history": np.full(SEQ_LEN, sales.mean(), dtype=np.float32)}
+            item["history"] = np.concatenate([item["history"], sales])[-SEQ_LEN:]
+            if current_stock is not None:
+                item["current_stock"] = current_stock
+            if lead_time_days is not None:
+                item["lead_time_days"] = lead_time_days
+            if product:
+                item["product"] = product
+            if location:
+                item["location"] = location
+            self.cache.pop(sku)
+            self._compute([sku])
+            return self.cache.get(sku)
+
+    def stats(self):
+        with self.lock:
+            return {**self.cache.stats(), "catalog": len(self.catalog), "alerts": len(self.alerts),
+                    "recomputed": self.recomputed}
+
+
+# Built in lifespan()
+service = None
+
+
+def create_service():
+    """Loads the LSTM once (path is relative to this file, not the working directory) and the catalog."""
+    from lstm_model import load_model
+    print(f"Loading M5-trained LSTM from {MODEL_PATH} ...")
+    service = ForecastService(load_model(), load_catalog())
+    print(f"Forecast service ready: {len(service.catalog)} SKUs ({CATALOG} catalog), "
+          f"TTL {CACHE_TTL_S:.0f}s, refresh every {REFRESH_S:.0f}s, cache {CACHE_SIZE} SKUs")
+    return service
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global service
+    service = create_service()
+    # Forecast every SKU in the background, first as the warm-up (startup does not wait for
+    # the whole catalog; early requests compute their SKU on demand), then every REFRESH_S
+    stop = threading.Event()
+    threading.Thread(target=service.run_refresher, args=(stop,), name="forecast-refresher", daemon=True).start()
+    yield
+    stop.set()
+
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")  # /forecast/{sku}, not one series per SKU
+    metrics.observe("http_request_seconds", time.perf_counter() - t0, path=route.path if route else request.url.path,
+                    status=str(response.status_code))
+    return response
+
+
+class SalesUpdate(BaseModel):
+    sales: List[float] = Field(..., min_length=1)  # new daily unit sales, oldest first
+    current_stock: Optional[int] = None
+    lead_time_days: Optional[int] = None
+    product: Optional[str] = None
+    location: Optional[str] = None
+
+
+@app.get("/forecast/{sku}")
+def get_forecast(sku: str):
+    try:
+        return service.forecast(sku)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown SKU {sku}")
+
+
+@app.get("/alerts")
+def get_alerts():
+    return service.all_alerts()
+
+
+@app.post("/sales/{sku}")
+def post_sales(sku: str, update: SalesUpdate):
+    return service.add_sales(sku, update.sales, update.current_stock, update.product, update.location,
+                               update.lead_time_days)
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return service.stats()
+
+
+@app.get("/health")
+def health():
+    """warm turns true once the first background sweep has forecast the whole catalog."""
+    return {"status": "healthy", "timestamp": datetime.now().isoformat(), "catalog": CATALOG,
+            "warm": service.alerts_refreshed is not None}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus scrape target: stage timings (forecast_compute / lstm_step), request latency, cache gauges."""
+    stats = service.stats()
+    lines = [metrics.render()]
+    for name, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f"# TYPE {metrics.prefix}_forecast_{name} gauge\n{metrics.prefix}_forecast_{name} {value}\n")
+    return "".join(lines)
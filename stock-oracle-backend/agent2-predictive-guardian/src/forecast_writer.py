@@ -0,0 +1,191 @@
+# src/forecast_writer.py — pluggable, streaming writers for SKU x horizon forecasts
+#
+# Formats (pick with make_writer / FORECAST_FORMAT):
+#   json     forecasts.json     legacy list of per SKU-day dicts (streamed, not pretty-printed)
+#   jsonl    forecasts.jsonl    one line per SKU: {"sku", "product", "location", "predicted_demand": [...]}
+#   parquet  forecasts.parquet  wide table: sku / product / location / d1..dH, one row group per batch
+#   npy      forecasts.npy      float32 [N, H] matrix (memory-mappable) + forecasts_index.parquet
+#
+# Every writer takes batches as they finish, so peak memory is one batch, not the catalog.
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+FORMATS = ("json", "jsonl", "parquet", "npy")
+META_COLS = ("sku", "product", "location")
+
+
+class ForecastWriter:
+    """Base class: write_batch(rows, predictions) per finished batch, then close()."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows_written = 0
+
+    def write_batch(self, rows, predictions):
+        """rows: list of dicts with sku / product / location; predictions: [len(rows), H]."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JSONForecastWriter(ForecastWriter):
+    """The original forecasts.json layout, written incrementally."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.f = open(path, "w")
+        self.f.write("[")
+
+    def write_batch(self, rows, predictions):
+        for row, pred in zip(rows, np.asarray(predictions)):
+            for day, val in enumerate(pred.tolist(), 1):
+                self.f.write(",\n" if self.rows_written else "\n")
+                self.f.write(json.dumps({
+                    "sku": row["sku"], "product": row["product"], "location": row["location"],
+                    "day": day, "predicted_demand": round(val, 2)
+                }))
+                self.rows_written += 1
+
+    def close(self):
+        if self.f:
+            self.f.write("\n]\n")
+            self.f.close()
+            self.f = None
+
+
+class JSONLForecastWriter(ForecastWriter):
+    """One JSON object per SKU, flushed per batch so readers can tail the file."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.f = open(path, "w")
+
+    def write_batch(self, rows, predictions):
+        lines = []
+        for row, pred in zip(rows, np.round(np.asarray(predictions, dtype=np.float64), 2)):
+            record = {k: row[k] for k in META_COLS}
+            record["predicted_demand"] = pred.tolist()
+            lines.append(json.dumps(record))
+        self.f.write("\n".join(lines) + "\n")
+        self.f.flush()
+        self.rows_written += len(rows)
+
+    def close(self):
+        if self.f:
+            self.f.close()
+            self.f = None
+
+
+class ParquetForecastWriter(ForecastWriter):
+    """Wide Parquet table (d1..dH float32 columns), appended one row group per batch."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.writer = None
+
+    def write_batch(self, rows, predictions):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        predictions = np.asarray(predictions, dtype=np.float32)
+        columns = {k: pa.array([row[k] for row in rows], pa.string()) for k in META_COLS}
+        for d in range(predictions.shape[1]):
+            columns[f"d{d + 1}"] = pa.array(predictions[:, d])
+        table = pa.table(columns)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema, compression="zstd")
+        self.writer.write_table(table)
+        self.rows_written += len(rows)
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+
+
+class NpyForecastWriter(ForecastWriter):
+    """
+    float32 [total, H] .npy filled in place through a memory map, plus a small
+    SKU index Parquet next to it. total (the SKU count) must be known up front.
+    """
+
+    def __init__(self, path, total, horizon):
+        super().__init__(path)
+        self.matrix = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(total, horizon))
+        self.index = []
+
+    def write_batch(self, rows, predictions):
+        end = self.rows_written + len(rows)
+        if end > len(self.matrix):
+            raise ValueError(f"NpyForecastWriter sized for {len(self.matrix)} SKUs, got {end}")
+        self.matrix[self.rows_written:end] = predictions
+        self.index.extend({k: row[k] for k in META_COLS} for row in rows)
+        self.rows_written = end
+
+    def close(self):
+        if self.matrix is not None:
+            self.matrix.flush()
+            self.matrix = None
+            pd.DataFrame(self.index, columns=list(META_COLS)).to_parquet(index_path(self.path), index=False)
+
+
+def index_path(npy_path):
+    return os.path.splitext(npy_path)[0] + "_index.parquet"
+
+
+def make_writer(fmt, out_dir, total=None, horizon=None, name="forecasts"):
+    """Writer for one of FORMATS inside out_dir as <name>.<fmt> (npy also needs total and horizon)."""
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{name}.{fmt}")
+    if fmt == "json":
+        return JSONForecastWriter(path)
+    if fmt == "jsonl":
+        return JSONLForecastWriter(path)
+    if fmt == "parquet":
+        return ParquetForecastWriter(path)
+    if fmt == "npy":
+        if total is None or horizon is None:
+            raise ValueError("npy format needs total (SKU count) and horizon")
+        return NpyForecastWriter(path, total, horizon)
+    raise ValueError(f"Unknown forecast format '{fmt}' (expected one of {FORMATS})")
+
+
+# ==========================================
+# READERS
+# ==========================================
+def iter_jsonl(path):
+    """Lazily yields one SKU record at a time from forecasts.jsonl."""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_forecasts(path):
+    """
+    (index DataFrame with sku / product / location, float32 [N, H] matrix) from a
+    .npy (memory-mapped, nothing read up front), .parquet, .jsonl or legacy .json file.
+    """
+    if path.endswith(".npy"):
+        return pd.read_parquet(index_path(path)), np.load(path, mmap_mode='r')
+    if path.endswith(".parquet"):
+        table = pd.read_parquet(path)
+        day_cols = [c for c in table.columns if c not in META_COLS]
+        return table[list(META_COLS)], table[day_cols].to_numpy(dtype=np.float32)
+    if path.endswith(".jsonl"):
+        records = list(iter_jsonl(path))
+        index = pd.DataFrame([{k: r[k] for k in META_COLS} for r in records], columns=list(META_COLS))
+        return index, np.array([r["predicted_demand"] for r in records], dtype=np.float32).reshape(len(records), -1)
+    with open(path) as f:
+        long = pd.DataFrame(json.load(f))
+    wide = long.pivot_table(index=list(META_COLS), columns="day", values="predicted_demand", sort=False)
+    return wide.index.to_frame(index=False), wide.to_numpy(dtype=np.float32)
@@ -0,0 +1,222 @@
+# src/hierarchy.py — coherent forecasts over the M5 item → dept → store hierarchy
+# Run with: python hierarchy.py --method mint_shrink                  (all leaves, parquet output)
+#      or:  python hierarchy.py --method bu mint_shrink               (one forecasts_<method> file each)
+#      or:  python hierarchy.py --bottom lstm --evaluate               (hold out the last horizon, score every method)
+#
+# Every aggregate node (total, state, store, category, department, store x department)
+# gets a cheap vectorized base forecast; the item x store leaves get the weekly-profile
+# baseline or the batched LSTM. Reconciliation then makes all levels add up:
+#   bu           bottom-up: leaves as forecast, aggregates are their sums
+#   td           top-down: the total forecast split by each leaf's historical share
+#   wls          MinT with a diagonal W (per-node base-forecast error variance)
+#   mint_shrink  MinT with the shrunk (Schäfer–Strimmer) error covariance
+# The summing matrix S = [A; I] stays scipy.sparse and MinT is solved in its
+# "projection" form, so 30k leaves cost a few sparse products and one solve over the
+# ~100 aggregate nodes — never an n x n matrix.
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from baselines import weekly_profile_forecast_matrix
+from m5_store import STORE_DIR, M5Store, store_exists
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output", "hierarchy")
+# Aggregation levels above the item x store leaves; () is the grand total
+HIERARCHY_LEVELS = [(), ('state_id',), ('store_id',), ('cat_id',), ('dept_id',), ('store_id', 'dept_id')]
+METHODS = ("bu", "td", "wls", "mint_shrink")
+BASE_WINDOW = 56  # days of history behind every base forecast (8 full weeks)
+
+
+def level_name(level):
+    return "/".join(level) or "total"
+
+
+def summing_matrix(index, levels=HIERARCHY_LEVELS):
+    """
+    Aggregation part A of the summing matrix S = [A; I] for the leaves in index
+    (one row per series, with the M5 id columns). Returns (A as CSR [n_agg, n_leaves],
+    nodes frame with level / node / location for the aggregate rows).
+    """
+    m = len(index)
+    blocks, nodes = [], []
+    for level in levels:
+        if level:
+            keys = index[list(level)].astype(str).agg("/".join, axis=1)
+            codes, labels = pd.factorize(keys, sort=True)
+        else:
+            codes, labels = np.zeros(m, dtype=np.int64), np.array(["Total"])
+        blocks.append(sparse.csr_matrix((np.ones(m, dtype=np.float32), (codes, np.arange(m))),
+                                        shape=(len(labels), m)))
+        location = (index.groupby(codes)['store_id'].first().to_numpy() if 'store_id' in level else
+                    index.groupby(codes)['state_id'].first().to_numpy() if 'state_id' in level else "ALL")
+        nodes.append(pd.DataFrame({'level': level_name(level), 'node': labels, 'location': location}))
+    return sparse.vstack(blocks, format="csr"), pd.concat(nodes, ignore_index=True)
+
+
+def base_forecasts(A, bottom_history, steps, bottom="weekly", model=None):
+    """Base forecasts (aggregates [n_agg, steps], leaves [n_leaves, steps]), one vectorized call per tier."""
+    agg_fc = weekly_profile_forecast_matrix(A @ bottom_history, steps, BASE_WINDOW)
+    if bottom == "lstm":
+        from lstm_model import SEQ_LEN, batched_lstm_forecast
+        bottom_fc = batched_lstm_forecast(model, bottom_history[:, -SEQ_LEN:], steps=steps).astype(np.float64)
+    else:
+        bottom_fc = weekly_profile_forecast_matrix(bottom_history, steps, BASE_WINDOW)
+    return agg_fc, bottom_fc
+
+
+def shrinkage_lambda(X):
+    """
+    Schäfer–Strimmer shrinkage intensity of the error correlations toward zero, as in
+    MinT-shrink. X is [T, n] errors; every pairwise sum is taken through the [T, T]
+    Gram matrix, so the cost is O(T^2 n) rather than O(T n^2).
+    """
+    T = len(X)
+    var = (X ** 2).mean(axis=0)
+    Xs = X[:, var > 0] / np.sqrt(var[var > 0])
+    Xs2 = Xs ** 2
+    cross = ((Xs @ Xs.T) ** 2).sum() - (Xs2.sum(axis=0) ** 2).sum()  # sum over i != j of (sum_t x_ti x_tj)^2
+    fourth = (Xs2.sum(axis=1) ** 2).sum() - (Xs2 ** 2).sum()        # sum over i != j of sum_t x_ti^2 x_tj^2
+    var_corr = (fourth - cross / T) / (T * (T - 1))
+    corr_sq = cross / T ** 2
+    return float(np.clip(var_corr / corr_sq, 0, 1)) if corr_sq > 0 else 1.0
+
+
+def reconcile(A, agg_fc, bottom_fc, method="mint_shrink", residuals=None, bottom_history=None):
+    """
+    Coherent leaf forecasts [n_leaves, steps]; the aggregates are then A @ leaves.
+    residuals: [T, n_agg + n_leaves] base-forecast errors (wls / mint_shrink).
+    bottom_history: [n_leaves, T] sales, for the td proportions.
+    """
+    if method == "bu":
+        return bottom_fc
+    if method == "td":
+        if A.shape[0] == 0 or A[0].nnz != A.shape[1]:
+            raise ValueError("td needs the grand total as the first aggregate level")
+        recent = bottom_history[:, -BASE_WINDOW:].sum(axis=1)
+        share = recent / recent.sum() if recent.sum() > 0 else np.full(len(recent), 1 / len(recent))
+        return share[:, None] * agg_fc[0][None, :]
+    if method not in ("wls", "mint_shrink"):
+        raise ValueError(f"Unknown method '{method}' (expected one of {METHODS})")
+    if residuals is None:
+        raise ValueError(f"{method} needs base-forecast residuals")
+
+    # MinT: b~ = b^ - (W U)_leaves (U' W U)^-1 (a^ - A b^), with U' = [I, -A] so U'y = 0 on coherent y
+    n_agg = A.shape[0]
+    var = np.maximum((residuals ** 2).mean(axis=0), 1e-6)
+    var_a, var_b = var[:n_agg], var[n_agg:]
+    At = A.T.tocsr()
+    wu_b = -(At.multiply(var_b[:, None])).toarray()  # D U, leaf rows
+    uwu = np.diag(var_a) + (A @ At.multiply(var_b[:, None])).toarray()
+    if method == "mint_shrink":
+        lam = shrinkage_lambda(residuals)
+        Xa, Xb = residuals[:, :n_agg], residuals[:, n_agg:]
+        xu = Xa - (A @ Xb.T).T  # X U: [T, n_agg]
+        T = len(residuals)
+        wu_b = lam * wu_b + (1 - lam) * (Xb.T @ xu) / T
+        uwu = lam * uwu + (1 - lam) * (xu.T @ xu) / T
+    gap = agg_fc - A @ bottom_fc
+    return bottom_fc - wu_b @ np.linalg.solve(uwu, gap)
+
+
+def forecast_hierarchy(A, bottom_history, steps, methods=METHODS, bottom="weekly", model=None):
+    """
+    Base forecasts from the end of bottom_history, base-forecast errors on the
+    `steps` days before it, and every requested reconciliation.
+    Returns ({method: leaf forecasts}, base aggregates, base leaves, timings).
+    """
+    timings = {}
+    t0 = time.perf_counter()
+    agg_fc, bottom_fc = base_forecasts(A, bottom_history, steps, bottom, model)
+    timings['base'] = time.perf_counter() - t0
+
+    residuals = None
+    if {"wls", "mint_shrink"} & set(methods):
+        t0 = time.perf_counter()
+        fit_hist, actual = bottom_history[:, :-steps], bottom_history[:, -steps:]
+        res_agg, res_bottom = base_forecasts(A, fit_hist, steps, bottom, model)
+        residuals = np.hstack([(A @ actual - res_agg).T, (actual - res_bottom).T])
+        timings['residuals'] = time.perf_counter() - t0
+
+    results = {}
+    for method in methods:
+        t0 = time.perf_counter()
+        results[method] = reconcile(A, agg_fc, bottom_fc, method, residuals, bottom_history)
+        timings[method] = time.perf_counter() - t0
+    return results, agg_fc, bottom_fc, timings
+
+
+def _level_scores(A, nodes, history, actual, agg_fc, bottom_fc, index):
+    """Mean RMSSE per hierarchy level (leaves last) of forecasts for every node."""
+    from backtest import score
+    _, _, rmsse = score(np.vstack([A @ history, history]), np.vstack([A @ actual, actual]),
+                        np.vstack([agg_fc, bottom_fc]))
+    levels = np.concatenate([nodes['level'].to_numpy(), np.full(len(index), "item_id/store_id", dtype=object)])
+    return pd.Series(rmsse).groupby(levels, sort=False).mean()
+
+
+def write_forecasts(out_dir, fmt, nodes, index, agg_fc, bottom_fc, name="forecasts"):
+    """
+    All nodes through forecast_writer into <out_dir>/<name>.<fmt>: aggregates first
+    (sku = node label, product = level), then leaves.
+    """
+    from forecast_writer import make_writer
+    rows = [{"sku": n, "product": lvl, "location": loc}
+            for lvl, n, loc in zip(nodes['level'], nodes['node'], nodes['location'])]
+    rows += [{"sku": i, "product": i, "location": s} for i, s in zip(index['item_id'], index['store_id'])]
+    matrix = np.vstack([agg_fc, bottom_fc]).astype(np.float32)
+    with make_writer(fmt, out_dir, total=len(rows), horizon=matrix.shape[1], name=name) as writer:
+        writer.write_batch(rows, matrix)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconciled forecasts over the M5 hierarchy")
+    parser.add_argument("--method", nargs="+", default=["mint_shrink"], choices=METHODS,
+                        help="Reconciliation method(s); each is written to forecasts_<method>.<format>")
+    parser.add_argument("--bottom", default="weekly", choices=["weekly", "lstm"], help="Leaf base forecaster")
+    parser.add_argument("--steps", type=int, default=28)
+    parser.add_argument("--evaluate", action="store_true",
+                        help="Hold out the last --steps days and report RMSSE per level for base and every method")
+    parser.add_argument("--format", default="parquet", help="forecast_writer format for the reconciled output")
+    parser.add_argument("--out", default=OUTPUT_DIR)
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    args = parser.parse_args()
+
+    if not store_exists(args.store_dir):
+        raise SystemExit(f"No converted store at {args.store_dir} (run python m5_store.py first)")
+    store = M5Store(args.store_dir)
+    model = None
+    if args.bottom == "lstm":
+        from lstm_model import load_model
+        model = load_model()
+
+    t0 = time.perf_counter()
+    A, nodes = summing_matrix(store.index)
+    print(f"S: {A.shape[0]} aggregate nodes + {A.shape[1]} leaves ({A.nnz} non-zeros) "
+          f"in {time.perf_counter() - t0:.2f}s")
+    # Enough history for the base window, the residual window and (with --evaluate) the holdout
+    days = BASE_WINDOW + args.steps * (3 if args.evaluate else 2)
+    history = np.asarray(store.sales[:, -days:], dtype=np.float64)
+
+    if args.evaluate:
+        methods = list(dict.fromkeys(args.method + list(METHODS)))
+        train, actual = history[:, :-args.steps], history[:, -args.steps:]
+        results, agg_fc, bottom_fc, timings = forecast_hierarchy(A, train, args.steps, methods, args.bottom, model)
+        table = {"base": _level_scores(A, nodes, train, actual, agg_fc, bottom_fc, store.index)}
+        for method, leaves in results.items():
+            table[method] = _level_scores(A, nodes, train, actual, A @ leaves, leaves, store.index)
+        print(f"\nMean RMSSE per level, last {args.steps} days held out ({args.bottom} leaves):")
+        print(pd.DataFrame(table).round(3).to_string())
+    else:
+        results, agg_fc, bottom_fc, timings = forecast_hierarchy(A, history, args.steps, args.method,
+                                                                 args.bottom, model)
+        incoherence = np.abs(agg_fc - A @ bottom_fc).sum() / max(np.abs(agg_fc).sum(), 1e-9)
+        print(f"Base forecasts were {incoherence:.1%} incoherent")
+        for method, leaves in results.items():
+            write_forecasts(args.out, args.format, nodes, store.index, A @ leaves, leaves, name=f"forecasts_{method}")
+            print(f"Wrote {method} forecasts for {len(nodes) + len(leaves)} nodes → "
+                  f"{os.path.join(args.out, f'forecasts_{method}.{args.format}')}")
+    print("Timings: " + ", ".join(f"{k} {v:.2f}s" for k, v in timings.items()))
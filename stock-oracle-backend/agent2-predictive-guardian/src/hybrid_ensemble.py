@@ -1,110 +1,166 @@
 # src/hybrid_ensemble.py — FINAL WINNING VERSION (LSTM + Rule-Based Fallback)
-import torch
+# Run with: python hybrid_ensemble.py
+#      or:  python hybrid_ensemble.py --artifact ../models/lstm_hybrid.onnx --mc-samples 0   (no torch at all)
+#
+# Importable: run() is the whole pipeline; torch and the eager LSTM are only loaded when
+# the point forecast or the MC-dropout bands actually need them.
+import argparse
 import numpy as np
-from datetime import datetime, timedelta
+import pandas as pd
 import json
 import os
+import sys
+import zlib
+from lstm_runtime import MODEL_PATH, load_forecaster
+from baselines import rule_based_forecast
+from forecast_writer import make_writer
+from alerting import evaluate, to_alert_records
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+from instrumentation import metrics, print_stage_summary, stage, start_profile
 
-# LOAD YOUR M5-TRAINED LSTM (this is your gold)
-class LSTMForecaster(torch.nn.Module):
-    def __init__(self):
-        super().__init__()
-        self.lstm = torch.nn.LSTM(1, 100, 2, batch_first=True, dropout=0.2)
-        self.fc = torch.nn.Linear(100, 1)
-    def forward(self, x):
-        out, _ = self.lstm(x)
-        return self.fc(out[:, -1, :])
-
-print("Loading your M5-trained LSTM model from ../models/lstm_hybrid.pth ...")
-model = LSTMForecaster()
-model.load_state_dict(torch.load("../models/lstm_hybrid.pth", map_location="cpu"))
-model.eval()
-print("LSTM loaded successfully! (Loss 357 — top-tier M5 accuracy)\n")
-
-# Rule-based seasonality (your Vision fallback)
-def rule_based_forecast(last_60, steps=30):
-    trend = np.polyfit(range(len(last_60)), last_60, 1)
-    base = np.polyval(trend, range(len(last_60), len(last_60)+steps))
-    seasonal = 25 * np.sin(2 * np.pi * np.arange(steps) / 7) + 15 * np.sin(2 * np.pi * np.arange(steps) / 30.5)
-    noise = np.random.normal(0, 8, steps)
-    return np.maximum(base + seasonal + noise, 1)
-
-# LSTM rolling forecast
-def lstm_forecast(last_60):
-    seq = torch.tensor(last_60, dtype=torch.float32).unsqueeze(0).unsqueeze(-1)
-    preds = []
-    with torch.no_grad():
-        cur = seq.clone()
-        for _ in range(30):
-            pred = model(cur)
-            preds.append(pred.item())
-            cur = torch.cat([cur[:,1:,:], pred.unsqueeze(1)], dim=1)
-    return np.maximum(preds, 1)
-
-products = [
+# Batched inference: SKUs per forward pass, and whether to carry LSTM (h, c) state
+# between steps (faster, approximate) instead of sliding the 60-day window (exact)
+LSTM_CHUNK_SIZE = 1024
+LSTM_STATEFUL = os.environ.get("LSTM_STATEFUL", "0") == "1"
+# Optional exported artifact for the point forecast (python lstm_export.py), e.g. lstm_hybrid.onnx
+LSTM_ARTIFACT = os.environ.get("LSTM_ARTIFACT")
+# Monte Carlo dropout paths for P10 / P50 / P90 bands (0 = point forecast only, the default);
+# the P90 hybrid then sets safety stock in the alerting step. The paths run on the same
+# recurrence as the point forecast, one point-forecast cost each: LSTM_STATEFUL=1
+# LSTM_MC_SAMPLES=8 is the cheap option (bands for less than one exact point forecast),
+# exact-window bands cost ~1.3x an exact point forecast per path
+LSTM_MC_SAMPLES = int(os.environ.get("LSTM_MC_SAMPLES", "0"))
+# Forecast output: json (legacy layout), jsonl, parquet or npy — see forecast_writer.py
+FORECAST_FORMAT = os.environ.get("FORECAST_FORMAT", "json")
+# agent2-predictive-guardian/output, wherever the script is launched from
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output")
+
+PRODUCTS = [
     {"sku": "STEEL-001",  "name": "Steel Sheets",      "location": "Rack B2"},
     {"sku": "CHAIR-001",  "name": "Office Chair",      "location": "Warehouse A"},
     {"sku": "CEMENT-001", "name": "Cement Bags",       "location": "Dock 3"},
     {"sku": "PAINT-001",  "name": "Industrial Paint",  "location": "Chemical Zone"},
 ]
 
-forecasts = []
-alerts = []
 
-print("AGENT 2 — PREDICTIVE GUARDIAN ACTIVATED")
-print("Running LSTM + Rule-Based Hybrid Forecast...\n")
+def load_lstm():
+    """The eager M5-trained LSTM (imports torch)."""
+    from lstm_model import load_model
+    # LOAD YOUR M5-TRAINED LSTM (this is your gold)
+    print(f"Loading your M5-trained LSTM model from {MODEL_PATH} ...")
+    with stage("load_model"):
+        model = load_model()
+    print("LSTM loaded successfully! (Loss 357 — top-tier M5 accuracy)\n")
+    return model
+
+
+def simulate_history(products):
+    """Realistic last 60 days per SKU (M5-style), its rule-based forecast and the stock on hand."""
+    histories, rule_preds, stocks = [], [], []
+    with stage("history_and_rules"):
+        for p in products:
+            # Generate realistic last 60 days (M5-style); crc32, not the per-process salted hash(),
+            # so a SKU gets the same history every run (and the same seed as forecast_api.py)
+            np.random.seed(zlib.crc32(p["sku"].encode()))
+            last_60 = np.maximum(10, 80 + 0.05 * np.arange(60) + 30 * np.sin(2 * np.pi * np.arange(60) / 7) + np.random.normal(0, 15, 60)).astype(np.float32)
+            histories.append(last_60)
+
+            # Rule-based forecast (your Vision fallback)
+            rule_preds.append(rule_based_forecast(last_60))
+            stocks.append(np.random.randint(70, 140))
+    return np.stack(histories), np.stack(rule_preds), stocks
+
 
-for p in products:
-    # Generate realistic last 60 days (M5-style)
-    np.random.seed(hash(p["sku"]) & 0xffffffff)
-    last_60 = np.maximum(10, 80 + 0.05 * np.arange(60) + 30 * np.sin(2 * np.pi * np.arange(60) / 7) + np.random.normal(0, 15, 60)).astype(np.float32)
+def hybrid_forecast(histories, rule_preds, model=None, artifact=LSTM_ARTIFACT, mc_samples=LSTM_MC_SAMPLES):
+    """
+    Hybrid point forecast [N, 30] and, with mc_samples > 0, its P90 path (else None).
+    The eager LSTM is loaded only if model is None and an exported artifact does not
+    cover everything (the point forecast without one, or the MC-dropout bands).
+    """
+    if model is None and (not artifact or mc_samples > 0):
+        model = load_lstm()
+
+    # LSTM forecast — all SKUs in one batched pass
+    with stage("lstm_forecast"):
+        if artifact:
+            lstm_preds = load_forecaster(artifact)(histories, chunk_size=LSTM_CHUNK_SIZE)
+        else:
+            from lstm_model import batched_lstm_forecast
+            lstm_preds = batched_lstm_forecast(model, histories, chunk_size=LSTM_CHUNK_SIZE, stateful=LSTM_STATEFUL)
 
-    # LSTM forecast
-    lstm_pred = lstm_forecast(last_60)
-    
-    # Rule-based forecast (your Vision fallback)
-    rule_pred = rule_based_forecast(last_60)
-    
     # Hybrid = 70% LSTM + 30% Rule-Based (100% Vision Document)
-    hybrid = 0.7 * lstm_pred + 0.3 * rule_pred
-    hybrid = np.maximum(hybrid, 1)
+    hybrid_preds = np.maximum(0.7 * lstm_preds + 0.3 * rule_preds, 1)
+
+    # Uncertainty: K dropout paths per SKU in one batched call, centred on the point
+    # forecast → P90 hybrid path (>= the point path without any clamping)
+    hybrid_p90 = None
+    if mc_samples > 0:
+        from lstm_model import mc_dropout_forecast
+        with stage("mc_dropout"):
+            lstm_q = mc_dropout_forecast(model, histories, samples=mc_samples, chunk_size=LSTM_CHUNK_SIZE,
+                                         stateful=LSTM_STATEFUL, seed=0, center=lstm_preds)
+        hybrid_p90 = np.maximum(0.7 * lstm_q[:, 2] + 0.3 * rule_preds, 1)
+    return hybrid_preds, hybrid_p90
 
-    current_stock = np.random.randint(70, 140)
-    week_demand = hybrid[:7].sum()
+
+def run(products=PRODUCTS, output_dir=OUTPUT_DIR, fmt=FORECAST_FORMAT, artifact=LSTM_ARTIFACT,
+        mc_samples=LSTM_MC_SAMPLES, model=None):
+    """Forecasts every product, writes the forecasts + alerts.json to output_dir and returns the alerts."""
+    print("AGENT 2 — PREDICTIVE GUARDIAN ACTIVATED")
+    print("Running LSTM + Rule-Based Hybrid Forecast...\n")
+    histories, rule_preds, stocks = simulate_history(products)
+    hybrid_preds, hybrid_p90 = hybrid_forecast(histories, rule_preds, model, artifact, mc_samples)
 
     # Save forecasts
-    for i, val in enumerate(hybrid):
-        forecasts.append({
-            "sku": p["sku"], "product": p["name"], "location": p["location"],
-            "day": i+1, "predicted_demand": round(float(val), 2)
-        })
-
-    # CRITICAL RUN-OUT ALERT
-    if current_stock < week_demand * 1.2:
-        reorder = int(week_demand - current_stock + 280)
-        alerts.append({
-            "severity": "critical",
-            "agent": "PredictiveGuardian",
-            "sku": p["sku"],
-            "product": p["name"],
-            "location": p["location"],
-            "current_stock": current_stock,
-            "7day_demand": round(week_demand),
-            "reorder_qty": reorder,
-            "message": f"{p['name']} at {p['location']} will RUN OUT in less than 7 days!\n"
-                       f"Current: {current_stock} → 7-day need: {round(week_demand)} → "
-                       f"REORDER {reorder} units IMMEDIATELY!"
-        })
-        print(f"CRITICAL → {p['name']} at {p['location']} — RUN OUT in <7 days!")
-
-# SAVE OUTPUT
-os.makedirs("./output", exist_ok=True)
-with open("./output/forecasts.json", "w") as f: json.dump(forecasts, f, indent=2)
-with open("./output/alerts.json", "w") as f: json.dump(alerts, f, indent=2)
-
-print("\n" + "="*80)
-print("AGENT 2 — PREDICTIVE GUARDIAN: 100% COMPLETE")
-print("LSTM + Rule-Based Hybrid (Vision Fallback)")
-print(f"Generated {len(alerts)} CRITICAL 'RUN OUT' alerts")
-print("Check → ./output/alerts.json")
-print("="*80)
\ No newline at end of file
+    os.makedirs(output_dir, exist_ok=True)
+    with stage(f"{fmt}_write"), \
+            make_writer(fmt, output_dir, total=len(products), horizon=hybrid_preds.shape[1]) as writer:
+        writer.write_batch([{"sku": p["sku"], "product": p["name"], "location": p["location"]} for p in products],
+                           hybrid_preds)
+
+    # Run-out check for every SKU at once (days of cover vs lead time, reorder quantities)
+    inventory = pd.DataFrame({"sku": [p["sku"] for p in products], "product": [p["name"] for p in products],
+                              "location": [p["location"] for p in products], "on_hand": stocks})
+    with stage("alerting"):
+        evaluated = evaluate(inventory, hybrid_preds, upper=hybrid_p90)
+        alerts = to_alert_records(evaluated[evaluated["severity"].notna()])
+    metrics.inc("alerts", len(alerts))
+    for a in alerts:
+        if a["severity"] == "critical":
+            print(f"CRITICAL → {a['product']} at {a['location']} — RUN OUT in {a['days_of_cover']:.1f} days!")
+
+    # SAVE OUTPUT
+    with stage("json_write"), open(os.path.join(output_dir, "alerts.json"), "w") as f:
+        json.dump(alerts, f, indent=2)
+    return alerts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent 2 — LSTM + rule-based hybrid forecast and run-out alerts")
+    parser.add_argument("--artifact", default=LSTM_ARTIFACT,
+                        help="Exported point-forecast artifact (.onnx / .ts.pt from lstm_export.py)")
+    parser.add_argument("--mc-samples", type=int, default=LSTM_MC_SAMPLES,
+                        help="MC-dropout paths for the P90 band (0 = point forecast only, no eager LSTM)")
+    parser.add_argument("--format", default=FORECAST_FORMAT, help="json, jsonl, parquet or npy")
+    parser.add_argument("--out", default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    # PROFILE=cprofile|py-spy profiles the whole run (see shared/instrumentation.py)
+    profiler = start_profile("hybrid_ensemble")
+    alerts = run(output_dir=args.out, fmt=args.format, artifact=args.artifact, mc_samples=args.mc_samples)
+
+    print("\n" + "="*80)
+    print("AGENT 2 — PREDICTIVE GUARDIAN: 100% COMPLETE")
+    print("LSTM + Rule-Based Hybrid (Vision Fallback)")
+    print(f"Generated {len(alerts)} stock-out alerts "
+          f"({sum(a['severity'] == 'critical' for a in alerts)} CRITICAL 'RUN OUT')")
+    print("Check → ./output/alerts.json")
+    print("="*80)
+
+    profiler.stop()
+    print_stage_summary()
+    metrics.log_batch("hybrid_ensemble", skus=len(PRODUCTS), alerts=len(alerts))
+
+
+if __name__ == "__main__":
+    main()
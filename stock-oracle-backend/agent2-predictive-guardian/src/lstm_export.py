@@ -0,0 +1,145 @@
+# src/lstm_export.py — export models/lstm_hybrid.pth to TorchScript / ONNX (fp32 + dynamic int8)
+# Run with: python lstm_export.py                          (all formats, parity check on)
+#      or:  python lstm_export.py --formats onnx --no-int8 --steps 30
+#
+# Writes next to the checkpoint:
+#   lstm_hybrid.ts.pt / lstm_hybrid.int8.ts.pt   TorchScript (int8 = torch dynamic quantization)
+#   lstm_hybrid.onnx  / lstm_hybrid.int8.onnx    ONNX (int8 = onnxruntime dynamic quantization)
+# Every artifact is checked against the eager fp32 model before the script exits 0.
+import argparse
+import os
+import sys
+import warnings
+
+import numpy as np
+import torch
+
+from lstm_model import MODEL_PATH, SEQ_LEN, batched_lstm_forecast, load_model
+from lstm_runtime import MODELS_DIR, ExportedForecaster
+
+# Parity tolerances vs eager fp32 (mean relative error over all SKU-days)
+FP32_TOLERANCE = 1e-4
+INT8_TOLERANCE = 0.05
+
+
+class RollingForecaster(torch.nn.Module):
+    """LSTMForecaster plus the rolling loop as one graph: [N, 60] histories → [N, steps]."""
+
+    def __init__(self, model, steps=30, stateful=False):
+        super().__init__()
+        self.lstm = model.lstm
+        self.fc = model.fc
+        self.steps = steps
+        self.stateful = stateful
+
+    def _head(self, seq_out):
+        # fc on a [N, 1, H] slice exports as MatMul + Add rather than Gemm, which
+        # onnxruntime's quantizer mis-rewrites (it drops Gemm's transB)
+        return self.fc(seq_out[:, -1:, :]).squeeze(1)
+
+    def forward(self, histories):
+        x = histories.unsqueeze(-1)
+        preds = []
+        if self.stateful:
+            seq_out, state = self.lstm(x)
+            pred = self._head(seq_out)
+            preds.append(pred)
+            for _ in range(self.steps - 1):
+                seq_out, state = self.lstm(pred.unsqueeze(1), state)
+                pred = self._head(seq_out)
+                preds.append(pred)
+        else:
+            window = x
+            for _ in range(self.steps):
+                out, _ = self.lstm(window)
+                pred = self._head(out)
+                preds.append(pred)
+                window = torch.cat([window[:, 1:, :], pred.unsqueeze(1)], dim=1)
+        return torch.clamp(torch.cat(preds, dim=1), min=1.0)
+
+
+def quantize(model):
+    """Dynamic int8 quantization of nn.LSTM / nn.Linear weights (activations stay fp32)."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.LSTM, torch.nn.Linear}, dtype=torch.qint8)
+
+
+def example_histories(n=8, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(SEQ_LEN)
+    return np.maximum(10, 80 + 30 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 15, (n, SEQ_LEN))).astype(np.float32)
+
+
+def export_torchscript(model, path, steps=30, stateful=False, int8=False):
+    wrapper = RollingForecaster(quantize(model) if int8 else model, steps, stateful).eval()
+    with torch.inference_mode():
+        traced = torch.jit.trace(wrapper, torch.from_numpy(example_histories()), check_trace=False)
+    # Keep the horizon readable from the artifact (ExportedForecaster sizes its output with it)
+    torch.jit.save(traced, path, _extra_files={"steps": str(steps)})
+    return path
+
+
+def export_onnx(model, path, steps=30, stateful=False, int8=False):
+    """fp32 graph via torch.onnx; int8 is onnxruntime's dynamic quantization of that graph."""
+    fp32_path = path.replace(".int8.onnx", ".onnx")
+    if not int8 or not os.path.exists(fp32_path):
+        wrapper = RollingForecaster(model, steps, stateful).eval()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            torch.onnx.export(
+                wrapper, (torch.from_numpy(example_histories()),), fp32_path,
+                input_names=["histories"], output_names=["forecast"],
+                dynamic_axes={"histories": {0: "n"}, "forecast": {0: "n"}},
+                opset_version=17, dynamo=False,
+            )
+    if int8:
+        import logging
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        logging.getLogger().setLevel(logging.ERROR)  # silences the "consider pre-processing" hint
+        quantize_dynamic(fp32_path, path, weight_type=QuantType.QInt8, op_types_to_quantize=["LSTM", "MatMul"])
+    return path
+
+
+def parity(path, model, steps, stateful, n=256):
+    """Mean relative error of an artifact vs the eager fp32 model on synthetic histories."""
+    histories = example_histories(n, seed=1)
+    reference = batched_lstm_forecast(model, histories, steps=steps, stateful=stateful)
+    exported = ExportedForecaster(path)(histories)
+    return float(np.abs(exported - reference).mean() / np.abs(reference).mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the Agent 2 LSTM for optimized CPU inference")
+    parser.add_argument("--checkpoint", default=MODEL_PATH)
+    parser.add_argument("--out-dir", default=MODELS_DIR)
+    parser.add_argument("--formats", nargs="+", default=["torchscript", "onnx"], choices=["torchscript", "onnx"])
+    parser.add_argument("--no-int8", action="store_true", help="Skip the dynamically quantized variants")
+    parser.add_argument("--steps", type=int, default=30, help="Forecast horizon baked into the graph")
+    parser.add_argument("--stateful", action="store_true", help="Export the stateful (h, c) recurrence")
+    parser.add_argument("--no-check", action="store_true", help="Skip the parity check")
+    args = parser.parse_args()
+
+    model = load_model(args.checkpoint)
+    name = os.path.splitext(os.path.basename(args.checkpoint))[0]
+    os.makedirs(args.out_dir, exist_ok=True)
+    failed = False
+    for fmt in args.formats:
+        for int8 in ([False] if args.no_int8 else [False, True]):
+            suffix = (".int8" if int8 else "") + (".ts.pt" if fmt == "torchscript" else ".onnx")
+            path = os.path.join(args.out_dir, name + suffix)
+            export = export_torchscript if fmt == "torchscript" else export_onnx
+            # quantize_dynamic returns a quantized copy, so the fp32 model is shared by every export
+            export(model, path, args.steps, args.stateful, int8)
+            line = f"{path}  ({os.path.getsize(path) / 2**20:.2f} MB)"
+            if not args.no_check:
+                err = parity(path, model, args.steps, args.stateful)
+                ok = err <= (INT8_TOLERANCE if int8 else FP32_TOLERANCE)
+                failed |= not ok
+                line += f"  parity: mean rel err {err:.2e} {'OK' if ok else 'FAILED'}"
+            print(line)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
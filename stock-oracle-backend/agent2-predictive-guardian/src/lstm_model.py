@@ -0,0 +1,118 @@
+# src/lstm_model.py — shared LSTM forecaster + batched multi-SKU inference
+import os
+import sys
+
+import numpy as np
+import torch
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+from instrumentation import stage
+from lstm_runtime import MODEL_PATH, SEQ_LEN  # noqa: F401 (SEQ_LEN re-exported for callers)
+
+
+class LSTMForecaster(torch.nn.Module):
+    def __init__(self, input_size=1, hidden_size=100, num_layers=2):
+        super().__init__()
+        self.lstm = torch.nn.LSTM(input_size, hidden_size, num_layers, batch_first=True, dropout=0.2)
+        self.fc = torch.nn.Linear(hidden_size, 1)
+
+    def forward(self, x):
+        out, _ = self.lstm(x)
+        return self.fc(out[:, -1, :])
+
+
+def load_model(path=MODEL_PATH):
+    model = LSTMForecaster()
+    model.load_state_dict(torch.load(path, map_location="cpu"))
+    model.eval()
+    return model
+
+
+def lstm_forecast(model, last_60, steps=30):
+    """Original one-SKU rolling forecast: re-runs the full 60-step window for every step."""
+    seq = torch.tensor(last_60, dtype=torch.float32).unsqueeze(0).unsqueeze(-1)
+    preds = []
+    with torch.no_grad():
+        cur = seq.clone()
+        for _ in range(steps):
+            pred = model(cur)
+            preds.append(pred.item())
+            cur = torch.cat([cur[:, 1:, :], pred.unsqueeze(1)], dim=1)
+    return np.maximum(preds, 1)
+
+
+def batched_lstm_forecast(model, histories, steps=30, chunk_size=1024, stateful=False):
+    """
+    Rolling forecast for many SKUs at once.
+    histories: [N, 60] array of the last 60 days per SKU -> returns [N, steps].
+
+    stateful=True runs the window once and then carries the LSTM (h, c) state,
+    feeding only the newest prediction per step (~60x less work per step).
+    stateful=False slides the 60-day window exactly like lstm_forecast, batched.
+    """
+    histories = np.ascontiguousarray(histories, dtype=np.float32)
+    out = np.empty((len(histories), steps), dtype=np.float32)
+    with torch.inference_mode():
+        for start in range(0, len(histories), chunk_size):
+            x = torch.from_numpy(histories[start:start + chunk_size]).unsqueeze(-1)
+            preds = []
+            if stateful:
+                with stage("lstm_step"):
+                    seq_out, state = model.lstm(x)
+                    pred = model.fc(seq_out[:, -1, :])
+                preds.append(pred)
+                for _ in range(steps - 1):
+                    with stage("lstm_step"):
+                        seq_out, state = model.lstm(pred.unsqueeze(1), state)
+                        pred = model.fc(seq_out[:, -1, :])
+                    preds.append(pred)
+            else:
+                window = x
+                for _ in range(steps):
+                    with stage("lstm_step"):
+                        pred = model(window)
+                    preds.append(pred)
+                    window = torch.cat([window[:, 1:, :], pred.unsqueeze(1)], dim=1)
+            out[start:start + len(x)] = torch.cat(preds, dim=1).numpy()
+    return np.maximum(out, 1)
+
+
+def mc_dropout_forecast(model, histories, steps=30, samples=8, quantiles=(0.1, 0.5, 0.9),
+                        chunk_size=1024, stateful=False, seed=None, center=None):
+    """
+    Probabilistic rolling forecast via Monte Carlo dropout: the LSTM's
+    inter-layer dropout stays on and K = `samples` batched passes over the SKUs
+    give K stochastic paths each. Returns [N, len(quantiles), steps] (default
+    P10 / P50 / P90 paths). Repeating every SKU K times in one [N * K] batch was
+    measured no faster than the K passes (slower for the exact window), so it is
+    not used.
+
+    stateful must match the point forecast the bands are shown with (mixing the
+    recurrences puts the point outside its own band). Cost per path is about one
+    point forecast of the same recurrence:
+      stateful=True   the cheap option: K=8 on 200 SKUs takes ~0.7 s, less than
+                      one exact point forecast (~1.1 s)
+      stateful=False  ~1.3x an exact point forecast per path, so K=16 is ~21x
+
+    center: the [N, steps] point forecast (same recurrence). Every SKU's paths are
+    shifted so their median path equals it, i.e. the bands are the dropout spread
+    around the point forecast and P10 <= point <= P90 holds by construction.
+    """
+    histories = np.ascontiguousarray(histories, dtype=np.float32)
+    out = np.empty((len(histories), len(quantiles), steps), dtype=np.float32)
+    was_training = model.lstm.training
+    with torch.random.fork_rng(enabled=seed is not None):
+        if seed is not None:
+            torch.manual_seed(seed)
+        model.lstm.train()  # dropout only lives between the LSTM layers; fc stays deterministic
+        try:
+            for start in range(0, len(histories), chunk_size):
+                chunk = histories[start:start + chunk_size]
+                paths = np.stack([batched_lstm_forecast(model, chunk, steps=steps, chunk_size=len(chunk),
+                                                        stateful=stateful) for _ in range(samples)], axis=1)
+                if center is not None:
+                    paths += (center[start:start + len(chunk)] - np.median(paths, axis=1))[:, None, :]
+                out[start:start + len(chunk)] = np.quantile(paths, quantiles, axis=1).transpose(1, 0, 2)
+        finally:
+            model.lstm.train(was_training)
+    return np.maximum(out, 1) if center is not None else out
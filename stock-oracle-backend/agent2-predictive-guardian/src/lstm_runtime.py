@@ -0,0 +1,70 @@
+# src/lstm_runtime.py — run an exported LSTM forecaster (ONNX Runtime or TorchScript) on CPU
+#
+# Artifacts come from lstm_export.py. Each one holds the LSTM *and* the rolling loop,
+# so a call maps [N, 60] histories straight to [N, steps] forecasts. Loading an .onnx
+# file needs only numpy + onnxruntime — no torch in the forecasting workers.
+import json
+import os
+
+import numpy as np
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models")
+# Shared with lstm_model.py, defined here so callers can read them without importing torch
+MODEL_PATH = os.path.join(MODELS_DIR, "lstm_hybrid.pth")
+SEQ_LEN = 60
+
+
+class ExportedForecaster:
+    """
+    forecaster = ExportedForecaster("../models/lstm_hybrid.int8.onnx")
+    preds = forecaster(histories)   # float32 [N, steps], floored at 1 like batched_lstm_forecast
+    """
+
+    def __init__(self, path, threads=None):
+        self.path = path
+        if path.endswith(".onnx"):
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            if threads:
+                options.intra_op_num_threads = threads
+            self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+            self.input_name = self.session.get_inputs()[0].name
+            self.steps = self.session.get_outputs()[0].shape[1]
+            self._run = lambda x: self.session.run(None, {self.input_name: x})[0]
+        else:
+            import torch
+            if threads:
+                torch.set_num_threads(threads)
+            extra = {"steps": ""}
+            self.module = torch.jit.load(path, map_location="cpu", _extra_files=extra)
+            self.steps = int(extra["steps"])
+
+            def run(x):
+                with torch.inference_mode():
+                    return self.module(torch.from_numpy(x)).numpy()
+            self._run = run
+
+    def __call__(self, histories, chunk_size=1024):
+        histories = np.ascontiguousarray(histories, dtype=np.float32)
+        out = np.empty((len(histories), self.steps), dtype=np.float32)
+        for start in range(0, len(histories), chunk_size):
+            out[start:start + chunk_size] = self._run(histories[start:start + chunk_size])
+        return out
+
+
+def load_forecaster(path, threads=None):
+    return ExportedForecaster(path, threads)
+
+
+def train_end_path(checkpoint):
+    """Sidecar written by train_lstm.py next to a checkpoint: the days it was trained on."""
+    return os.path.splitext(checkpoint)[0] + ".train.json"
+
+
+def checkpoint_train_end(checkpoint):
+    """Number of leading days (d_1..d_N) the checkpoint saw in training, or None if unrecorded."""
+    try:
+        with open(train_end_path(checkpoint)) as f:
+            return int(json.load(f)["train_end"])
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,63 @@
+# src/m5_dataset.py — O(1) sliding-window dataset over many M5 series + DataLoader setup
+import os
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset
+
+from lstm_runtime import SEQ_LEN  # one window length for training and inference
+
+
+class M5WindowDataset(Dataset):
+    """
+    Sliding windows (x = 60 days, y = next day) over all series.
+
+    Every series is packed into one contiguous float32 buffer; a cumulative
+    count of windows per series maps a global index to (series, offset) with a
+    single searchsorted, and samples are zero-copy torch.from_numpy views.
+    """
+
+    def __init__(self, series_list, seq_len=SEQ_LEN):
+        self.seq_len = seq_len
+        series_list = [np.asarray(s, dtype=np.float32) for s in series_list]
+        lengths = np.array([len(s) for s in series_list], dtype=np.int64)
+        self.buffer = np.concatenate(series_list) if series_list else np.zeros(0, np.float32)
+        self.starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+        # Same window count per series as the original dataset: len - seq_len - 1
+        counts = np.maximum(lengths - seq_len - 1, 0)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        s = np.searchsorted(self.offsets, idx, side='right') - 1
+        base = self.starts[s] + idx - self.offsets[s]
+        x = torch.from_numpy(self.buffer[base:base + self.seq_len]).unsqueeze(-1)
+        y = torch.from_numpy(self.buffer[base + self.seq_len:base + self.seq_len + 1])
+        return x, y
+
+
+def make_loader(dataset, batch_size=64, shuffle=True, num_workers=None, pin_memory=None, sampler=None):
+    """
+    DataLoader tuned for CPU training: worker processes share the buffer
+    copy-on-write, stay alive across epochs, and pin memory when a GPU is present.
+    """
+    if num_workers is None:
+        num_workers = min(4, os.cpu_count() or 1)
+    if pin_memory is None:
+        pin_memory = torch.cuda.is_available()
+    return DataLoader(
+        dataset,
+        batch_size=batch_size,
+        shuffle=shuffle if sampler is None else False,
+        sampler=sampler,
+        num_workers=num_workers,
+        pin_memory=pin_memory,
+        persistent_workers=num_workers > 0,
+        prefetch_factor=4 if num_workers > 0 else None,
+    )
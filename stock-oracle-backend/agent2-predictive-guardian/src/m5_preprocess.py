@@ -1,27 +1,35 @@
 import pandas as pd
-from tqdm import tqdm
+from m5_store import DATA_DIR, get_store, store_exists
 
-def load_m5_series(item_id: str, store_id: str = "CA_1"):
-    sales = pd.read_csv("data/m5/sales_train_validation.csv")
-    calendar = pd.read_csv("data/m5/calendar.csv")
-    prices = pd.read_csv("data/m5/sell_prices.csv")
+def to_prophet_frame(values, dates):
+    """Builds the Prophet-style ds/y frame for one series of daily sales (one row per day)."""
+    return pd.DataFrame({
+        'ds': pd.to_datetime(dates[:len(values)]),
+        'y': values.astype(float)
+    })
 
-    # Filter item
-    item_row = sales[sales['item_id'] == item_id]
-    if item_row.empty:
-        raise ValueError(f"Item {item_id} not found")
+def load_m5_series(item_id: str, store_id: str = "CA_1"):
+    """
+    Daily sales of item_id at store_id as a ds/y frame. Zero-sales days are
+    kept so the series stays aligned with the calendar.
+    """
+    # Fast path: memory-mapped store built by m5_store.py (O(1) lookup, no CSV parsing)
+    if store_exists():
+        store = get_store()
+        try:
+            values = store.series((item_id, store_id))
+        except ValueError as err:
+            raise ValueError(f"Item {item_id} not found at store {store_id}") from err
+        return to_prophet_frame(values, store.dates)
 
-    # Get sales for specific store
-    store_col = f"{store_id}_d"
-    if store_col not in item_row.columns:
-        store_col = item_row.columns[6:]  # fallback
+    sales = pd.read_csv(f"{DATA_DIR}/sales_train_validation.csv")
+    calendar = pd.read_csv(f"{DATA_DIR}/calendar.csv")
 
-    series = item_row.iloc[0, 6:].reset_index(drop=True)
-    dates = calendar['date'][:len(series)]
+    # Filter item at the requested store
+    item_row = sales[(sales['item_id'] == item_id) & (sales['store_id'] == store_id)]
+    if item_row.empty:
+        raise ValueError(f"Item {item_id} not found at store {store_id}")
 
-    df = pd.DataFrame({
-        'ds': pd.to_datetime(dates),
-        'y': series.values.astype(float)
-    })
-    df = df[df['y'] > 0]  # Remove zero-sales periods
-    return df
\ No newline at end of file
+    day_cols = [c for c in sales.columns if c.startswith('d_')]
+    series = item_row.iloc[0][day_cols]
+    return to_prophet_frame(series.values, calendar['date'].values)
@@ -0,0 +1,158 @@
+# src/m5_store.py — one-time conversion of the M5 CSVs into a compact, memory-mapped store
+# Run once with: python m5_store.py [--data-dir ../data/m5] [--out ../data/m5_store]
+#
+# Layout of the store directory:
+#   sales.npy         [N series, T days] int16 (or float32), opened with mmap_mode='r'
+#   index.parquet     id / item_id / dept_id / cat_id / store_id / state_id, one row per series
+#   calendar.parquet  calendar.csv with parsed dates
+#   prices.parquet    sell_prices.csv with categorical keys and float32 prices
+import argparse
+import os
+import time
+from functools import cached_property, lru_cache
+
+import numpy as np
+import pandas as pd
+
+# M5 CSVs live in agent2-predictive-guardian/data/m5 (override with M5_DATA_DIR)
+DATA_DIR = os.environ.get(
+    "M5_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "m5"),
+)
+STORE_DIR = os.environ.get(
+    "M5_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "m5_store"),
+)
+INDEX_COLS = ['id', 'item_id', 'dept_id', 'cat_id', 'store_id', 'state_id']
+# Aggregation levels of the M5 hierarchy (besides the bottom item x store level)
+LEVELS = ['total', 'state_id', 'store_id', 'cat_id', 'dept_id']
+
+
+def store_exists(store_dir=STORE_DIR):
+    return os.path.exists(os.path.join(store_dir, "sales.npy"))
+
+
+def convert(data_dir=DATA_DIR, out_dir=STORE_DIR, dtype="int16", chunksize=2000):
+    """Streams sales_train_validation.csv into sales.npy chunk by chunk (bounded RAM)."""
+    os.makedirs(out_dir, exist_ok=True)
+    sales_csv = f"{data_dir}/sales_train_validation.csv"
+    with open(sales_csv) as f:
+        header = f.readline().rstrip("\n").split(",")
+        n_rows = sum(1 for _ in f)
+    day_cols = [c for c in header if c.startswith('d_')]
+
+    sales = np.lib.format.open_memmap(os.path.join(out_dir, "sales.npy"), mode="w+",
+                                      dtype=dtype, shape=(n_rows, len(day_cols)))
+    index_parts = []
+    start = 0
+    for chunk in pd.read_csv(sales_csv, chunksize=chunksize):
+        values = chunk[day_cols].to_numpy()
+        if np.issubdtype(np.dtype(dtype), np.integer):
+            info = np.iinfo(dtype)
+            if values.min() < info.min or values.max() > info.max or not np.all(values == np.round(values)):
+                raise ValueError(f"Sales do not fit in {dtype}; rerun with --dtype float32")
+        sales[start:start + len(chunk)] = values
+        index_parts.append(chunk[INDEX_COLS])
+        start += len(chunk)
+    sales.flush()
+    del sales
+
+    index = pd.concat(index_parts, ignore_index=True)
+    index.to_parquet(os.path.join(out_dir, "index.parquet"), index=False)
+
+    calendar = pd.read_csv(f"{data_dir}/calendar.csv", parse_dates=['date'])
+    calendar.to_parquet(os.path.join(out_dir, "calendar.parquet"), index=False)
+
+    prices_csv = f"{data_dir}/sell_prices.csv"
+    if os.path.exists(prices_csv):
+        prices = pd.read_csv(prices_csv, dtype={'store_id': 'category', 'item_id': 'category',
+                                                'wm_yr_wk': np.int32, 'sell_price': np.float32})
+        prices.to_parquet(os.path.join(out_dir, "prices.parquet"), index=False)
+    return n_rows, len(day_cols)
+
+
+@lru_cache(maxsize=None)
+def get_store(store_dir=STORE_DIR):
+    """Process-wide shared M5Store (opened once)."""
+    return M5Store(store_dir)
+
+
+class M5Store:
+    """
+    Read-only view over a converted store. Opening it reads only the small
+    index; sales rows are paged in from the memory map on access, and
+    calendar / prices are loaded lazily on first use.
+
+    Series are addressed in O(1) by M5 id ('FOODS_3_090_CA_1_validation')
+    or by an (item_id, store_id) pair.
+    """
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        self.sales = np.load(os.path.join(store_dir, "sales.npy"), mmap_mode='r')
+        self.index = pd.read_parquet(os.path.join(store_dir, "index.parquet"))
+        rows = range(len(self.index))
+        self._row_by_id = dict(zip(self.index['id'], rows))
+        self._row_by_key = dict(zip(zip(self.index['item_id'], self.index['store_id']), rows))
+
+    @cached_property
+    def calendar(self):
+        return pd.read_parquet(os.path.join(self.store_dir, "calendar.parquet"))
+
+    @cached_property
+    def prices(self):
+        return pd.read_parquet(os.path.join(self.store_dir, "prices.parquet"))
+
+    @cached_property
+    def dates(self):
+        return self.calendar['date'].to_numpy()[:self.sales.shape[1]]
+
+    def row(self, key):
+        """Row number for an M5 id or an (item_id, store_id) tuple."""
+        row = self._row_by_key.get(key) if isinstance(key, tuple) else self._row_by_id.get(key)
+        if row is None:
+            raise ValueError(f"Series {key} not found")
+        return row
+
+    def series(self, key):
+        """One series as a float32 array, e.g. series('FOODS_3_090_CA_1_validation')
+        or series(('FOODS_3_090', 'CA_1'))."""
+        return np.asarray(self.sales[self.row(key)], dtype=np.float32)
+
+    def get_many(self, keys):
+        """Many series at once as a float32 [len(keys), T] matrix (one fancy-indexed read)."""
+        rows = np.fromiter((self.row(k) for k in keys), dtype=np.int64, count=len(keys))
+        return self.sales[rows].astype(np.float32)
+
+    def aggregate(self, level, chunk_size=4096):
+        """
+        Sums bottom-level series up to one hierarchy level ('total', 'state_id',
+        'store_id', 'cat_id', 'dept_id'). Returns (labels, float32 [K, T] matrix).
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Unknown level '{level}' (expected one of {LEVELS})")
+        if level == 'total':
+            codes, labels = np.zeros(len(self.index), dtype=np.int64), ['Total']
+        else:
+            codes, labels = pd.factorize(self.index[level], sort=True)
+        out = np.zeros((len(labels), self.sales.shape[1]), dtype=np.float64)
+        for start in range(0, len(codes), chunk_size):
+            np.add.at(out, codes[start:start + chunk_size], self.sales[start:start + chunk_size])
+        return list(labels), out.astype(np.float32)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the M5 CSVs into a memory-mapped store")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--out", default=STORE_DIR)
+    parser.add_argument("--dtype", choices=["int16", "float32"], default="int16")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    n, t = convert(args.data_dir, args.out, args.dtype)
+    print(f"Converted {n} series x {t} days → {args.out} in {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    store = M5Store(args.out)
+    store.series(store.index['id'].iloc[0])
+    print(f"Store opened and first series read in {(time.perf_counter() - t0) * 1000:.1f} ms")
@@ -1,89 +1,145 @@
 # src/prophet_baseline.py
 # Pure Prophet forecasting — clean, reliable, judge-approved
-from prophet import Prophet
 import pandas as pd
 from datetime import datetime, timedelta
 import json
+import os
+import sys
 import numpy as np
 from m5_preprocess import load_m5_series
+from baselines import fallback_forecast_matrix
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+from instrumentation import metrics, stage
 
 # Enable Prophet logging (optional)
 import logging
 logging.getLogger('prophet').setLevel(logging.ERROR)
 
+# Series with fewer non-zero sales days than this use the fallback
+MIN_HISTORY = 100
+
 class ProphetForecaster:
-    def __init__(self):
-        self.models = {}
+    def __init__(self, cache=None):
+        # Optional prophet_cache.ProphetModelCache: an unchanged series reuses its fitted
+        # model, one with a few new days warm-starts Stan from the cached parameters
+        self.cache = cache
 
-    def fit_and_forecast(self, item_id: str, periods: int = 30):
+    def fit_and_forecast(self, item_id: str, periods: int = 30, df=None, store_id: str = "CA_1"):
         """
-        Fit Prophet on M5 item and return 30-day forecast
+        Fit Prophet on M5 item at store_id and return 30-day forecast
+        (pass df with ds/y columns to skip re-reading the M5 CSVs)
         """
         try:
-            df = load_m5_series(item_id)
-            if len(df) < 100:
+            if df is None:
+                df = load_m5_series(item_id, store_id)
+            if (df['y'] > 0).sum() < MIN_HISTORY:
                 print(f"Warning: Not enough data for {item_id}")
                 return self._fallback_forecast(periods)
 
-            # Prepare data
-            df_prophet = df[['ds', 'y']].copy()
-            df_prophet = df_prophet[df_prophet['y'] > 0]
-
-            # Create and fit model
-            m = Prophet(
-                yearly_seasonality=True,
-                weekly_seasonality=True,
-                daily_seasonality=False,
-                seasonality_mode='multiplicative',
-                growth='linear'
-            )
-            
-            # Add monthly seasonality (very important for inventory!)
-            m.add_seasonality(name='monthly', period=30.5, fourier_order=8)
-            
-            # Add holiday effect (weekends often lower)
-            m.add_country_holidays(country_name='US')
-
-            m.fit(df_prophet)
-
-            # Make future dataframe
-            future = m.make_future_dataframe(periods=periods, freq='D')
-            forecast = m.predict(future)
-
-            # Extract future predictions
-            future_pred = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail(periods)
-            
-            # Clean and return
-            pred_values = future_pred['yhat'].values
-            pred_values = np.maximum(pred_values, 0.5)  # No zero/negative demand
-            
-            return {
-                'item_id': item_id,
-                'dates': [d.strftime('%Y-%m-%d') for d in future_pred['ds']],
-                'predicted': [round(float(x), 2) for x in pred_values],
-                'lower': [round(float(x), 2) for x in future_pred['yhat_lower']],
-                'upper': [round(float(x), 2) for x in future_pred['yhat_upper']],
-                'model': 'prophet'
-            }
+            # Cached per series (item at store), under the M5 id prophet_fleet.py uses
+            return self._fit_prophet(item_id, df, periods, key=f"{item_id}_{store_id}_validation")
 
         except Exception as e:
             print(f"Prophet failed for {item_id}: {e}")
             return self._fallback_forecast(periods)
 
+    def _fit_prophet(self, item_id: str, df, periods: int = 30, key=None):
+        m = self._fit_model(df, key)
+        return self._forecast(m, item_id, periods)
+
+    def _fit_model(self, df, key=None):
+        """Fitted Prophet model for df; with a cache and a series key, reuses or warm-starts."""
+        if self.cache is None or key is None:
+            return self._fit_new(df)
+        status, cached = self.cache.lookup(key, df)
+        metrics.inc("prophet_model_cache", status=status)
+        if status == 'hit':
+            return cached
+        m = self._fit_new(df, init=cached)
+        self.cache.put(key, df, m)
+        return m
+
+    def _fit_new(self, df, init=None):
+        # Prepare data
+        df_prophet = df[['ds', 'y']].copy()
+        df_prophet = df_prophet[df_prophet['y'] > 0]
+
+        m = self._build_model()
+        with stage("prophet_fit"):
+            if init is not None:
+                m.fit(df_prophet, init=init)  # warm start: optimizer begins at the previous optimum
+            else:
+                m.fit(df_prophet)
+        return m
+
+    def _build_model(self):
+        # Imported on first fit: Prophet pulls in cmdstanpy / Stan (~1s), which importing
+        # this module and the fallback path never need
+        from prophet import Prophet
+        # Create model
+        m = Prophet(
+            yearly_seasonality=True,
+            weekly_seasonality=True,
+            daily_seasonality=False,
+            seasonality_mode='multiplicative',
+            growth='linear'
+        )
+        
+        # Add monthly seasonality (very important for inventory!)
+        m.add_seasonality(name='monthly', period=30.5, fourier_order=8)
+        
+        # Add holiday effect (weekends often lower)
+        m.add_country_holidays(country_name='US')
+        return m
+
+    def _forecast(self, m, item_id: str, periods: int = 30):
+        # Make future dataframe
+        future = m.make_future_dataframe(periods=periods, freq='D')
+        forecast = m.predict(future)
+
+        # Extract future predictions
+        future_pred = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail(periods)
+        
+        # Clean and return
+        pred_values = future_pred['yhat'].values
+        pred_values = np.maximum(pred_values, 0.5)  # No zero/negative demand
+        
+        return {
+            'item_id': item_id,
+            'dates': [d.strftime('%Y-%m-%d') for d in future_pred['ds']],
+            'predicted': [round(float(x), 2) for x in pred_values],
+            'lower': [round(float(x), 2) for x in future_pred['yhat_lower']],
+            'upper': [round(float(x), 2) for x in future_pred['yhat_upper']],
+            'model': 'prophet'
+        }
+
     def _fallback_forecast(self, periods: int = 30):
         """Graceful fallback if Prophet fails"""
-        base = 25.0
-        trend = 0.8
-        seasonal = [np.sin(i / 3.5) * 12 for i in range(periods)]
-        values = [max(5, base + trend * i + seasonal[i] + np.random.normal(0, 4)) for i in range(periods)]
+        values = fallback_forecast_matrix(1, periods, np.random.default_rng())[0]
         dates = [(datetime.now() + timedelta(days=i+1)).strftime('%Y-%m-%d') for i in range(periods)]
         
         return {
             'item_id': 'fallback',
             'dates': dates,
-            'predicted': [round(v, 2) for v in values],
-            'lower': [round(v * 0.8, 2) for v in values],
-            'upper': [round(v * 1.2, 2) for v in values],
+            'predicted': [round(float(v), 2) for v in values],
+            'lower': [round(float(v) * 0.8, 2) for v in values],
+            'upper': [round(float(v) * 1.2, 2) for v in values],
+            'model': 'fallback_rule_based'
+        }
+
+    def fallback_forecast_many(self, item_ids, periods: int = 30, seed=None):
+        """
+        Fallback forecasts for a whole catalog in one NumPy pass (when Prophet
+        is unavailable). Returns [N, periods] arrays instead of per-item lists.
+        """
+        values = fallback_forecast_matrix(len(item_ids), periods, seed)
+        start = datetime.now() + timedelta(days=1)
+        return {
+            'item_ids': list(item_ids),
+            'dates': [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(periods)],
+            'predicted': values.round(2),
+            'lower': (values * 0.8).round(2),
+            'upper': (values * 1.2).round(2),
             'model': 'fallback_rule_based'
         }
 
@@ -0,0 +1,121 @@
+# src/prophet_cache.py — on-disk cache of fitted Prophet models, keyed by series + data fingerprint
+# Used by ProphetForecaster(cache=ProphetModelCache()) and prophet_fleet.py --model-cache
+#
+# lookup() decides how much work a refit needs:
+#   hit   history unchanged                  → the stored model is reused, Stan never runs
+#   warm  same history plus a few new days   → Stan starts from the previous parameters
+#   miss  new series / revised history       → cold fit
+# Entries live in one SQLite file; beyond max_mb the least recently used are evicted.
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+import numpy as np
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models", "prophet_cache.sqlite")
+DEFAULT_MAX_MB = 512
+WARM_START_DAYS = 28  # more new days than this and the old optimum is no longer a useful start
+MODEL_VERSION = "v1"  # bump when ProphetForecaster._build_model changes; old entries then miss
+
+
+def model_tag():
+    import prophet
+    return f"prophet-{prophet.__version__}-{MODEL_VERSION}"
+
+
+def fingerprint(df):
+    """Hash of a ds/y frame (dates and values), so any edit to the history changes it."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(df['ds'].to_numpy(dtype='datetime64[ns]').tobytes())
+    h.update(df['y'].to_numpy(dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def warm_start_params(m):
+    """Fitted Stan parameters of a Prophet model, in the shape Prophet.fit(init=...) expects."""
+    return {
+        'k': float(m.params['k'][0][0]),
+        'm': float(m.params['m'][0][0]),
+        'sigma_obs': float(m.params['sigma_obs'][0][0]),
+        'delta': np.asarray(m.params['delta'][0], dtype=np.float64),
+        'beta': np.asarray(m.params['beta'][0], dtype=np.float64),
+    }
+
+
+class ProphetModelCache:
+    """
+    cache = ProphetModelCache()
+    status, cached = cache.lookup("FOODS_3_090_CA_1", df)   # ('hit', model) / ('warm', params) / ('miss', None)
+    cache.put("FOODS_3_090_CA_1", df, fitted_model)
+    """
+
+    def __init__(self, path=CACHE_PATH, max_mb=DEFAULT_MAX_MB, warm_start_days=WARM_START_DAYS):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = int(max_mb * 2**20)
+        self.warm_start_days = warm_start_days
+        self.tag = model_tag()
+        self.counts = {'hit': 0, 'warm': 0, 'miss': 0}
+        self.last = None
+        # Fleet workers share the file: WAL lets readers run while one process writes
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS models (
+            key TEXT PRIMARY KEY, tag TEXT, n_rows INTEGER, fingerprint TEXT,
+            params TEXT, model BLOB, size INTEGER, used_at REAL)""")
+        self.db.commit()
+
+    def lookup(self, key, df):
+        row = self.db.execute("SELECT tag, n_rows, fingerprint, params FROM models WHERE key=?", (key,)).fetchone()
+        status, cached = 'miss', None
+        if row is not None and row[0] == self.tag:
+            _, n_rows, fp, params = row
+            new_days = len(df) - n_rows
+            if new_days == 0 and fingerprint(df) == fp:
+                status, cached = 'hit', self._load_model(key)
+            elif 0 < new_days <= self.warm_start_days and fingerprint(df.iloc[:n_rows]) == fp:
+                status, cached = 'warm', {k: np.asarray(v) if isinstance(v, list) else v
+                                          for k, v in json.loads(params).items()}
+        if status != 'miss':
+            self.db.execute("UPDATE models SET used_at=? WHERE key=?", (time.time(), key))
+            self.db.commit()
+        self.counts[status] += 1
+        self.last = status
+        return status, cached
+
+    def _load_model(self, key):
+        from prophet.serialize import model_from_json
+        blob, = self.db.execute("SELECT model FROM models WHERE key=?", (key,)).fetchone()
+        return model_from_json(zlib.decompress(blob).decode())
+
+    def put(self, key, df, m):
+        from prophet.serialize import model_to_json
+        blob = zlib.compress(model_to_json(m).encode(), 6)
+        params = {k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in warm_start_params(m).items()}
+        self.db.execute("INSERT OR REPLACE INTO models VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (key, self.tag, len(df), fingerprint(df), json.dumps(params), blob, len(blob), time.time()))
+        self._evict()
+        self.db.commit()
+
+    def _evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM models").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Oldest first until the cache is back under budget
+        doomed, freed = [], 0
+        for key, size in self.db.execute("SELECT key, size FROM models ORDER BY used_at"):
+            if total - freed <= self.max_bytes:
+                break
+            doomed.append((key,))
+            freed += size
+        self.db.executemany("DELETE FROM models WHERE key=?", doomed)
+
+    def stats(self):
+        entries, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM models").fetchone()
+        return {'entries': entries, 'size_mb': round(size / 2**20, 2), **self.counts}
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,238 @@
+# src/prophet_fleet.py — fit Prophet across thousands of M5 series in parallel, resumable
+# Run with: python prophet_fleet.py --items all --workers 8
+#      or:  python prophet_fleet.py --items FOODS_3_090 HOBBIES_1_001 --store CA_1
+#
+# Fitted models are kept in a ProphetModelCache (--model-cache, '' disables): a daily
+# refresh into a new --out reuses unchanged series and warm-starts the ones with new days.
+#
+# Finished series go to shard-*.jsonl; failed ones to failed.jsonl, and a rerun over the
+# same --out retries them.
+import argparse
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from m5_preprocess import DATA_DIR, to_prophet_frame
+from m5_store import STORE_DIR, M5Store, store_exists
+from prophet_baseline import MIN_HISTORY, ProphetForecaster
+from prophet_cache import CACHE_PATH, DEFAULT_MAX_MB, ProphetModelCache
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output", "prophet_fleet")
+FAILED_FILE = "failed.jsonl"
+
+# Per-worker state, set once by _init_worker
+_SALES = None
+_DATES = None
+_FORECASTER = None
+
+
+def _init_worker(sales_path, dates, cache_path, cache_mb):
+    global _SALES, _DATES, _FORECASTER
+    logging.getLogger('cmdstanpy').disabled = True  # one INFO line per chain otherwise
+    _SALES = np.load(sales_path, mmap_mode='r')  # shared via the page cache, never copied
+    _DATES = dates
+    _FORECASTER = ProphetForecaster(cache=ProphetModelCache(cache_path, cache_mb) if cache_path else None)
+
+
+def _fit_one(task):
+    row, series_id, item_id, store_id, periods = task
+    t0 = time.perf_counter()
+    record = {'id': series_id, 'item_id': item_id, 'store_id': store_id}
+    try:
+        df = to_prophet_frame(np.asarray(_SALES[row]), _DATES)
+        if (df['y'] > 0).sum() < MIN_HISTORY:
+            result, status, error = _FORECASTER._fallback_forecast(periods), 'short_history', None
+        else:
+            result, status, error = _FORECASTER._fit_prophet(item_id, df, periods, key=series_id), 'ok', None
+            if _FORECASTER.cache is not None:
+                record['model_cache'] = _FORECASTER.cache.last
+    except Exception as e:
+        result, status, error = _FORECASTER._fallback_forecast(periods), 'failed', f"{type(e).__name__}: {e}"
+    result['item_id'] = item_id
+    record.update(result, status=status, error=error, fit_seconds=round(time.perf_counter() - t0, 3))
+    return record
+
+
+class ShardWriter:
+    """Appends JSONL records to numbered shards; existing shards are never rewritten."""
+
+    def __init__(self, out_dir, shard_size=500):
+        self.out_dir = out_dir
+        self.shard_size = shard_size
+        self.shard_no = len(glob.glob(os.path.join(out_dir, "shard-*.jsonl")))
+        self.count = 0
+        self.f = None
+
+    def write(self, record):
+        if self.f is None or self.count >= self.shard_size:
+            self.close()
+            self.f = open(os.path.join(self.out_dir, f"shard-{self.shard_no:05d}.jsonl"), "w")
+            self.shard_no += 1
+            self.count = 0
+        self.f.write(json.dumps(record) + "\n")
+        self.f.flush()
+        self.count += 1
+
+    def close(self):
+        if self.f:
+            self.f.close()
+            self.f = None
+
+
+def _read_jsonl(path):
+    """Yields every record of path; a torn last line from an interrupted run is skipped."""
+    with open(path) as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def read_shards(out_dir):
+    """Yields every completed record, oldest shard first."""
+    for path in sorted(glob.glob(os.path.join(out_dir, "shard-*.jsonl"))):
+        yield from _read_jsonl(path)
+
+
+def read_failures(out_dir):
+    """Records of the series whose last attempt failed (retried by the next run)."""
+    path = os.path.join(out_dir, FAILED_FILE)
+    return list(_read_jsonl(path)) if os.path.exists(path) else []
+
+
+def load_sales_matrix(data_dir=DATA_DIR):
+    """Reads the M5 sales CSV once -> (index frame with id/item_id/store_id, float32 [N, T] matrix)."""
+    sales = pd.read_csv(f"{data_dir}/sales_train_validation.csv")
+    day_cols = [c for c in sales.columns if c.startswith('d_')]
+    index = sales[['id', 'item_id', 'store_id']].reset_index(drop=True)
+    return index, sales[day_cols].to_numpy(dtype=np.float32)
+
+
+def select_rows(index, items, store_id):
+    """Resolves 'all', M5 ids (FOODS_3_090_CA_1_validation) or item ids (at store_id) to row numbers."""
+    if items == ["all"]:
+        return list(range(len(index)))
+    by_id = dict(zip(index['id'], index.index))
+    by_item = dict(zip(zip(index['item_id'], index['store_id']), index.index))
+    rows = []
+    for item in items:
+        row = by_id.get(item, by_item.get((item, store_id)))
+        if row is None:
+            raise ValueError(f"Item {item} not found (store {store_id})")
+        rows.append(row)
+    return rows
+
+
+def summarize(out_dir):
+    # Newest record per series: shards written before failures had their own file may hold
+    # a failed attempt followed by the retry that succeeded
+    latest = {r['id']: r for r in read_shards(out_dir)}
+    for r in read_failures(out_dir):
+        latest.setdefault(r['id'], r)
+    records = list(latest.values())
+    fit = np.array([r['fit_seconds'] for r in records]) if records else np.zeros(1)
+    by_status, by_cache = {}, {}
+    for r in records:
+        by_status[r['status']] = by_status.get(r['status'], 0) + 1
+        if 'model_cache' in r:
+            by_cache[r['model_cache']] = by_cache.get(r['model_cache'], 0) + 1
+    return {
+        'series': len(records),
+        'by_status': by_status,
+        'by_model_cache': by_cache,
+        'fit_seconds_total': round(float(fit.sum()), 1),
+        'fit_seconds_mean': round(float(fit.mean()), 3),
+        'fit_seconds_p95': round(float(np.percentile(fit, 95)), 3),
+        'fit_seconds_max': round(float(fit.max()), 3),
+    }
+
+
+def run_fleet(items, workers=None, periods=30, store_id="CA_1", out_dir=OUTPUT_DIR,
+              shard_size=500, data_dir=DATA_DIR, store_dir=STORE_DIR, cache_path=CACHE_PATH,
+              cache_mb=DEFAULT_MAX_MB):
+    os.makedirs(out_dir, exist_ok=True)
+    done = {r['id'] for r in read_shards(out_dir) if r['status'] != 'failed'}
+    failed_before = {r['id']: r for r in read_failures(out_dir)}
+
+    if store_exists(store_dir):
+        # Workers memory-map the converted store directly
+        store = M5Store(store_dir)
+        index, dates = store.index, store.dates
+        sales_path, temp_sales = os.path.join(store_dir, "sales.npy"), False
+    else:
+        print(f"Loading M5 sales matrix from {data_dir} (once) ...")
+        index, matrix = load_sales_matrix(data_dir)
+        dates = pd.read_csv(f"{data_dir}/calendar.csv")['date'].values
+        sales_path, temp_sales = os.path.join(out_dir, "_sales.npy"), True
+
+    rows = [r for r in select_rows(index, items, store_id) if index.at[r, 'id'] not in done]
+    retry = {index.at[r, 'id'] for r in rows} & set(failed_before)
+    print(f"{len(done)} series already forecast, {len(rows)} to go ({len(retry)} retried after failing)")
+    if not rows:
+        return summarize(out_dir)
+    if temp_sales:
+        np.save(sales_path, matrix)
+        del matrix
+
+    tasks = [(r, index.at[r, 'id'], index.at[r, 'item_id'], index.at[r, 'store_id'], periods) for r in rows]
+    writer = ShardWriter(out_dir, shard_size)
+    # Failures outside this run stay listed; the ones being retried are re-added if they fail again
+    failed_log = open(os.path.join(out_dir, FAILED_FILE), "w")
+    for sid, record in failed_before.items():
+        if sid not in retry:
+            failed_log.write(json.dumps(record) + "\n")
+    failed_log.flush()
+    failures = 0
+    t0 = time.perf_counter()
+    ctx = multiprocessing.get_context("spawn")
+    try:
+        with ctx.Pool(workers, initializer=_init_worker,
+                      initargs=(sales_path, dates, cache_path, cache_mb)) as pool:
+            for i, record in enumerate(pool.imap_unordered(_fit_one, tasks, chunksize=4), 1):
+                if record['status'] == 'failed':
+                    failed_log.write(json.dumps(record) + "\n")
+                    failed_log.flush()
+                    failures += 1
+                else:
+                    writer.write(record)
+                if i % 100 == 0 or i == len(tasks):
+                    rate = i / (time.perf_counter() - t0)
+                    print(f"  {i}/{len(tasks)} series ({rate:.2f}/s, {failures} failed)")
+    finally:
+        writer.close()
+        failed_log.close()
+        if temp_sales:
+            os.remove(sales_path)
+
+    summary = summarize(out_dir)
+    with open(os.path.join(out_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel, resumable Prophet forecasts over M5 series")
+    parser.add_argument("--items", nargs="+", default=["all"],
+                        help="'all', M5 ids, or item ids (resolved at --store)")
+    parser.add_argument("--store", default="CA_1")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--periods", type=int, default=30)
+    parser.add_argument("--shard-size", type=int, default=500)
+    parser.add_argument("--out", default=OUTPUT_DIR)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--store-dir", default=STORE_DIR, help="Converted store (see m5_store.py), used if present")
+    parser.add_argument("--model-cache", default=CACHE_PATH, help="Fitted-model cache ('' disables)")
+    parser.add_argument("--cache-mb", type=float, default=DEFAULT_MAX_MB, help="Cache size before LRU eviction")
+    args = parser.parse_args()
+
+    summary = run_fleet(args.items, workers=args.workers, periods=args.periods, store_id=args.store,
+                        out_dir=args.out, shard_size=args.shard_size, data_dir=args.data_dir,
+                        store_dir=args.store_dir, cache_path=args.model_cache, cache_mb=args.cache_mb)
+    print(json.dumps(summary, indent=2))
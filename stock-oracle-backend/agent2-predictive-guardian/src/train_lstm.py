@@ -1,80 +1,205 @@
 # src/train_lstm.py — REAL M5 DATA + PER-ITEM LSTM (Vision Document 100%)
-import pandas as pd
+# Run with: python train_lstm.py                       (top 100 most volatile series, as before)
+#      or:  python train_lstm.py --top 0 --bf16 --threads 16 --samples-per-epoch 2000000 --resume
+import argparse
+import json
+import os
+import sys
+import time
+
 import numpy as np
+import pandas as pd
 import torch
 import torch.nn as nn
-from torch.utils.data import Dataset, DataLoader
-from tqdm import tqdm
-import os
+from torch.utils.data import RandomSampler
+
+from lstm_model import MODEL_PATH, SEQ_LEN, LSTMForecaster
+from lstm_runtime import train_end_path
+from m5_dataset import M5WindowDataset, make_loader
+from m5_store import DATA_DIR, STORE_DIR, get_store, store_exists
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+from instrumentation import metrics, print_stage_summary, profiled, stage
 
 # ------------------- CONFIG -------------------
-DATA_DIR = "data/m5"
-SEQ_LEN = 60
 BATCH_SIZE = 64
 EPOCHS = 12
+NUM_WORKERS = min(4, os.cpu_count() or 1)  # DataLoader worker processes
+VAL_DAYS = 28  # last 28 days of every series are held out (M5 horizon)
+CHECKPOINT_DIR = os.path.join(os.path.dirname(MODEL_PATH), "checkpoints")
 # ---------------------------------------------
 
-class LSTMForecaster(nn.Module):
-    def __init__(self, input_size=1, hidden_size=100, num_layers=2):
-        super().__init__()
-        self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True, dropout=0.2)
-        self.fc = nn.Linear(hidden_size, 1)
-    
-    def forward(self, x):
-        out, _ = self.lstm(x)
-        return self.fc(out[:, -1, :])
-
-class M5Dataset(Dataset):
-    def __init__(self, series_list):
-        self.series = [s.astype(np.float32) for s in series_list]
-    
-    def __len__(self):
-        return sum(len(s) - SEQ_LEN - 1 for s in self.series)
-    
-    def __getitem__(self, idx):
-        # Simple round-robin across all series
-        for s in self.series:
-            if idx < len(s) - SEQ_LEN - 1:
-                x = s[idx:idx+SEQ_LEN]
-                y = s[idx+SEQ_LEN]
-                return torch.from_numpy(x).unsqueeze(-1), torch.tensor(y).unsqueeze(-1)
-            idx -= len(s) - SEQ_LEN - 1
-        raise IndexError
-
-print("Loading REAL M5 data from data/m5/ ...")
-sales = pd.read_csv(f"{DATA_DIR}/sales_train_validation.csv")
-calendar = pd.read_csv(f"{DATA_DIR}/calendar.csv")
-prices = pd.read_csv(f"{DATA_DIR}/sell_prices.csv")
-
-# Take top 100 most volatile items (best for training)
-item_sales = sales.set_index('id').iloc[:, 5:].T  # d_1 to d_1913
-item_sales = item_sales.astype(float)
-top_items = item_sales.std().sort_values(ascending=False).head(100).index
-series_list = [item_sales[item].values for item in top_items]
-
-print(f"Training on {len(series_list)} real M5 time series (most volatile items)")
-
-dataset = M5Dataset(series_list)
-loader = DataLoader(dataset, batch_size=BATCH_SIZE, shuffle=True)
-
-model = LSTMForecaster()
-criterion = nn.MSELoss()
-optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
-
-print("Training LSTM on REAL M5 data...")
-for epoch in tqdm(range(EPOCHS)):
-    epoch_loss = 0
-    for x, y in loader:
+
+def load_series(top=100):
+    """Top-N most volatile M5 series (top=0 → the full catalog) as float32 arrays."""
+    if store_exists():
+        # Memory-mapped store (python m5_store.py): no CSV parsing, rows paged in on demand
+        print(f"Loading REAL M5 data from {STORE_DIR} ...")
+        sales = get_store().sales
+        if not top:
+            return list(np.asarray(sales, dtype=np.float32))
+        stds = np.concatenate([
+            sales[i:i + 4096].astype(np.float64).std(axis=1, ddof=1)
+            for i in range(0, len(sales), 4096)
+        ])
+        top_rows = np.argsort(-stds, kind="stable")[:top]
+        return [sales[r].astype(np.float32) for r in top_rows]
+
+    print(f"Loading REAL M5 data from {DATA_DIR} ...")
+    sales = pd.read_csv(f"{DATA_DIR}/sales_train_validation.csv")
+    item_sales = sales.set_index('id').iloc[:, 5:].T  # d_1 to d_1913
+    item_sales = item_sales.astype(np.float32)
+    if not top:
+        return [item_sales[item].values for item in item_sales.columns]
+    # Take top N most volatile items (best for training)
+    top_items = item_sales.std().sort_values(ascending=False).head(top).index
+    return [item_sales[item].values for item in top_items]
+
+
+def split_series(series_list, val_days=VAL_DAYS):
+    """Temporal split: train on everything but the last val_days, validate on those days."""
+    train = [s[:-val_days] for s in series_list]
+    val = [s[-(val_days + SEQ_LEN + 1):] for s in series_list]
+    return train, val
+
+
+def save_checkpoint(path, state):
+    tmp = path + ".tmp"
+    torch.save(state, tmp)
+    os.replace(tmp, path)  # never leave a half-written checkpoint behind
+
+
+def evaluate(model, loader, criterion, bf16):
+    model.eval()
+    total, n = 0.0, 0
+    with torch.inference_mode(), torch.autocast("cpu", dtype=torch.bfloat16, enabled=bf16):
+        for x, y in loader:
+            total += criterion(model(x).float(), y).item() * len(x)
+            n += len(x)
+    model.train()
+    return total / max(n, 1)
+
+
+def train(args):
+    torch.manual_seed(args.seed)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    with stage("load_data"):
+        series_list = load_series(args.top)
+    if args.train_end:
+        # Only d_1..d_train_end, so backtest.py can score origins after it out of sample
+        series_list = [s[:args.train_end] for s in series_list]
+    train_end = len(series_list[0])
+    train_series, val_series = split_series(series_list, args.val_days)
+    print(f"Training on {len(series_list)} real M5 time series "
+          f"({'full catalog' if not args.top else 'most volatile items'})")
+
+    train_set = M5WindowDataset(train_series, SEQ_LEN)
+    val_set = M5WindowDataset(val_series, SEQ_LEN)
+    sampler = None
+    if args.samples_per_epoch and args.samples_per_epoch < len(train_set):
+        sampler = RandomSampler(train_set, num_samples=args.samples_per_epoch)
+    loader = make_loader(train_set, batch_size=args.batch_size, shuffle=True,
+                         num_workers=args.workers, sampler=sampler)
+    val_loader = make_loader(val_set, batch_size=args.batch_size * 4, shuffle=False,
+                             num_workers=args.workers)
+    print(f"{len(train_set):,} train windows ({len(loader.sampler):,} per epoch), "
+          f"{len(val_set):,} validation windows, {torch.get_num_threads()} threads, "
+          f"bf16={'on' if args.bf16 else 'off'}, accumulation={args.accum_steps}")
+
+    model = LSTMForecaster()
+    criterion = nn.MSELoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=args.lr)
+
+    os.makedirs(args.checkpoint_dir, exist_ok=True)
+    last_path = os.path.join(args.checkpoint_dir, "last.pt")
+    start_epoch, best_val, bad_epochs = 0, float("inf"), 0
+    if args.resume and os.path.exists(last_path):
+        ckpt = torch.load(last_path, map_location="cpu")
+        model.load_state_dict(ckpt["model"])
+        optimizer.load_state_dict(ckpt["optimizer"])
+        start_epoch, best_val, bad_epochs = ckpt["epoch"] + 1, ckpt["best_val"], ckpt["bad_epochs"]
+        print(f"Resumed from {last_path} (epoch {start_epoch}, best val {best_val:.4f})")
+
+    print("Training LSTM on REAL M5 data...")
+    model.train()
+    for epoch in range(start_epoch, args.epochs):
+        t0 = time.perf_counter()
+        epoch_loss, seen = 0.0, 0
         optimizer.zero_grad()
-        pred = model(x)
-        loss = criterion(pred, y)
-        loss.backward()
-        optimizer.step()
-        epoch_loss += loss.item()
-    if (epoch+1) % 4 == 0:
-        print(f"Epoch {epoch+1}/{EPOCHS} - Loss: {epoch_loss/len(loader):.4f}")
-
-os.makedirs("./models", exist_ok=True)
-torch.save(model.state_dict(), "./models/lstm_hybrid.pth")
-print("REAL M5-TRAINED LSTM SAVED → ./models/lstm_hybrid.pth")
-print("YOUR AGENT 2 IS NOW THE MOST POWERFUL IN THE HACKATHON")
\ No newline at end of file
+        data_t0 = time.perf_counter()
+        for step, (x, y) in enumerate(loader, 1):
+            metrics.observe("stage_seconds", time.perf_counter() - data_t0, stage="data_loading")
+            with stage("train_step"):
+                with torch.autocast("cpu", dtype=torch.bfloat16, enabled=args.bf16):
+                    pred = model(x)
+                loss = criterion(pred.float(), y)
+                (loss / args.accum_steps).backward()
+                if step % args.accum_steps == 0 or step == len(loader):
+                    optimizer.step()
+                    optimizer.zero_grad()
+            epoch_loss += loss.item() * len(x)
+            seen += len(x)
+            data_t0 = time.perf_counter()
+        train_time = time.perf_counter() - t0
+
+        with stage("validate"):
+            val_loss = evaluate(model, val_loader, criterion, args.bf16)
+        improved = val_loss < best_val
+        with stage("checkpoint"):
+            if improved:
+                best_val, bad_epochs = val_loss, 0
+                os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+                torch.save(model.state_dict(), args.out)
+                # Validation days drive early stopping, so they count as seen
+                with open(train_end_path(args.out), "w") as f:
+                    json.dump({"train_end": train_end, "top": args.top, "val_days": args.val_days}, f)
+            else:
+                bad_epochs += 1
+            save_checkpoint(last_path, {
+                "epoch": epoch, "model": model.state_dict(), "optimizer": optimizer.state_dict(),
+                "best_val": best_val, "bad_epochs": bad_epochs, "args": vars(args),
+            })
+        metrics.log_batch("train_epoch", epoch=epoch + 1, train_loss=epoch_loss / max(seen, 1), val_loss=val_loss,
+                          samples_per_s=seen / train_time)
+
+        print(f"Epoch {epoch+1}/{args.epochs} - Loss: {epoch_loss / max(seen, 1):.4f} - "
+              f"Val: {val_loss:.4f}{' *' if improved else ''} - "
+              f"{seen / train_time:,.0f} samples/s - {time.perf_counter() - t0:.1f}s")
+        if bad_epochs >= args.patience:
+            print(f"Early stopping: no validation improvement for {args.patience} epochs")
+            break
+
+    print(f"REAL M5-TRAINED LSTM SAVED → {args.out} (best val loss {best_val:.4f})")
+    print("YOUR AGENT 2 IS NOW THE MOST POWERFUL IN THE HACKATHON")
+    print_stage_summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the Agent 2 LSTM on M5")
+    parser.add_argument("--top", type=int, default=100,
+                        help="Train on the N most volatile series (0 = full catalog)")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--lr", type=float, default=0.001)
+    parser.add_argument("--accum-steps", type=int, default=1, help="Gradient accumulation steps")
+    parser.add_argument("--samples-per-epoch", type=int, default=0,
+                        help="Random windows per epoch (0 = every window)")
+    parser.add_argument("--val-days", type=int, default=VAL_DAYS)
+    parser.add_argument("--train-end", type=int, default=0,
+                        help="Train on d_1..d_N only (0 = full history); recorded next to --out for backtest.py")
+    parser.add_argument("--patience", type=int, default=3, help="Early-stopping patience (epochs)")
+    parser.add_argument("--bf16", action="store_true", help="bfloat16 autocast on CPU")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS)
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    parser.add_argument("--resume", action="store_true", help="Continue from checkpoint-dir/last.pt")
+    parser.add_argument("--out", default=MODEL_PATH)
+    parser.add_argument("--seed", type=int, default=42)
+    with profiled("train_lstm"):  # PROFILE=cprofile|py-spy
+        train(parser.parse_args())
+
+
+# Guarded so DataLoader worker processes can import this module safely
+if __name__ == "__main__":
+    main()
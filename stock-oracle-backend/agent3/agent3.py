@@ -1,10 +1,17 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from sklearn.ensemble import IsolationForest
-from sklearn.svm import OneClassSVM
-from sklearn.preprocessing import StandardScaler
+import joblib
+import os
 import random
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from instrumentation import metrics, stage
+
+# scikit-learn is imported where a model is built or fitted, not here: the rules, the
+# compiled score() path and the API health check never need it (and it costs ~0.5s).
+# Unpickling a saved artifact still imports the estimators it contains.
 
 # ==========================================
 # PART 1: THE KNOWLEDGE BASE (RAG SIMULATION)
@@ -21,13 +28,193 @@ RAG_KNOWLEDGE_BASE = {
 # ==========================================
 # PART 2: THE ANOMALY SENTINEL (AGENT 3)
 # ==========================================
+# Bump FEATURE_SCHEMA_VERSION whenever FEATURES or their engineering changes,
+# so that stale model artifacts are refused instead of silently mis-scoring.
+FEATURES = ['qty', 'hour', 'damage_flag']
+FEATURE_SCHEMA_VERSION = 1
+# Fused risk above this is flagged. 0.0 reproduces "either model predicts -1";
+# raise it to flag only the most anomalous moves.
+RISK_THRESHOLD = float(os.environ.get("SENTINEL_RISK_THRESHOLD", "0.0"))
+
+def apply_hard_rules(transaction, hour):
+    """
+    Layer 1 hard rules for a single transaction.
+    Returns (reasons, context); an empty reasons list means no rule fired.
+    """
+    reasons = []
+    context = None
+    # Rule: Large adjustment at 3 AM
+    if 2 <= hour <= 5 and transaction['qty'] > 100:
+        reasons.append(f"Hard Rule Violation: High quantity move at {hour}:00.")
+        context = RAG_KNOWLEDGE_BASE["TIME_VIOLATION"]
+
+    # Rule: Transfer without receipt (Simulated by a flag here)
+    if transaction['type'] == 'transfer' and not transaction['has_receipt']:
+        reasons.append("Hard Rule Violation: Missing Receipt.")
+        context = RAG_KNOWLEDGE_BASE["UNMATCHED_TRANSFER"]
+    return reasons, context
+
+class SubsampledOneClassSVM:
+    """
+    Bagged kernel One-Class SVMs, each fit on a fixed-size random subsample.
+    Fit cost is bounded by max_samples, so it no longer grows with history size.
+    """
+    def __init__(self, nu=0.05, n_estimators=5, max_samples=2000, random_state=42):
+        self.nu = nu
+        self.n_estimators = n_estimators
+        self.max_samples = max_samples
+        self.random_state = random_state
+        self.estimators_ = []
+
+    def fit(self, X):
+        from sklearn.svm import OneClassSVM
+        rng = np.random.default_rng(self.random_state)
+        size = min(self.max_samples, len(X))
+        self.estimators_ = []
+        for _ in range(self.n_estimators):
+            idx = rng.choice(len(X), size, replace=False)
+            self.estimators_.append(OneClassSVM(nu=self.nu).fit(X[idx]))
+        return self
+
+    def decision_function(self, X):
+        return np.mean([est.decision_function(X) for est in self.estimators_], axis=0)
+
+    def predict(self, X):
+        return np.where(self.decision_function(X) < 0, -1, 1)
+
+class NystroemOneClassSVM:
+    """
+    Linear-time One-Class SVM: Nystroem RBF feature map + SGDOneClassSVM,
+    trained with partial_fit over row chunks so memory stays flat with history size.
+    """
+    def __init__(self, nu=0.05, n_components=300, epochs=5, chunk_size=10000, random_state=42):
+        self.nu = nu
+        self.n_components = n_components
+        self.epochs = epochs
+        self.chunk_size = chunk_size
+        self.random_state = random_state
+
+    def fit(self, X):
+        from sklearn.kernel_approximation import Nystroem
+        from sklearn.linear_model import SGDOneClassSVM
+        rng = np.random.default_rng(self.random_state)
+        # gamma matches OneClassSVM's gamma='scale' on standardized features
+        self.feature_map_ = Nystroem(gamma=1.0 / X.shape[1], n_components=min(self.n_components, len(X)),
+                                     random_state=self.random_state).fit(X)
+        self.sgd_ = SGDOneClassSVM(nu=self.nu, random_state=self.random_state)
+        for _ in range(self.epochs):
+            order = rng.permutation(len(X))
+            for start in range(0, len(X), self.chunk_size):
+                chunk = X[order[start:start + self.chunk_size]]
+                self.sgd_.partial_fit(self.feature_map_.transform(chunk))
+        return self
+
+    def decision_function(self, X):
+        return np.concatenate([
+            self.sgd_.decision_function(self.feature_map_.transform(X[start:start + self.chunk_size]))
+            for start in range(0, max(len(X), 1), self.chunk_size)
+        ])
+
+    def predict(self, X):
+        return np.where(self.decision_function(X) < 0, -1, 1)
+
+def _average_path_length(n):
+    """Expected isolation-tree path length for n samples (same formula as sklearn)."""
+    n = np.asarray(n, dtype=np.float64)
+    out = np.zeros_like(n)
+    out[n == 2] = 1.0
+    big = n > 2
+    out[big] = 2.0 * (np.log(n[big] - 1.0) + np.euler_gamma) - 2.0 * (n[big] - 1.0) / n[big]
+    return out
+
+class FastIsolationForest:
+    """
+    Fitted IsolationForest flattened into padded [trees, nodes] arrays, so a
+    few rows walk every tree at once in NumPy instead of 100 sklearn calls.
+    decision_function matches IsolationForest.decision_function.
+    """
+    def __init__(self, forest):
+        trees = [est.tree_ for est in forest.estimators_]
+        width = max(t.node_count for t in trees)
+        shape = (len(trees), width)
+        self.left = np.full(shape, -1, dtype=np.int64)
+        self.right = np.full(shape, -1, dtype=np.int64)
+        self.feature = np.zeros(shape, dtype=np.int64)
+        self.threshold = np.zeros(shape)
+        self.path = np.zeros(shape)  # depth + expected remaining path at each leaf
+        for i, (t, features) in enumerate(zip(trees, forest.estimators_features_)):
+            n = t.node_count
+            self.left[i, :n], self.right[i, :n] = t.children_left, t.children_right
+            leaf = t.children_left == -1
+            self.feature[i, :n] = np.where(leaf, 0, np.asarray(features)[np.maximum(t.feature, 0)])
+            self.threshold[i, :n] = t.threshold
+            depth = np.zeros(n)
+            for node in range(n):  # children always come after their parent
+                if not leaf[node]:
+                    depth[t.children_left[node]] = depth[t.children_right[node]] = depth[node] + 1
+            self.path[i, :n] = np.where(leaf, depth + _average_path_length(t.n_node_samples), 0)
+        self.max_depth = max(t.max_depth for t in trees)
+        self.denominator = len(trees) * _average_path_length([forest._max_samples])[0]
+        self.offset = forest.offset_
+        self._trees = np.arange(len(trees))
+
+    def decision_function(self, X):
+        X = np.atleast_2d(X)
+        node = np.zeros((len(X), len(self._trees)), dtype=np.int64)
+        rows = np.arange(len(X))[:, None]
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[self._trees, node]] <= self.threshold[self._trees, node]
+            child = np.where(go_left, self.left[self._trees, node], self.right[self._trees, node])
+            node = np.where(child == -1, node, child)
+        depths = self.path[self._trees, node].sum(axis=1)
+        return -(2.0 ** (-depths / self.denominator)) - self.offset
+
+class FastOneClassSVM:
+    """RBF OneClassSVM decision_function as one NumPy kernel product over the support vectors."""
+    def __init__(self, svm):
+        self.support_vectors = svm.support_vectors_
+        self.sv_norms = (svm.support_vectors_ ** 2).sum(axis=1)
+        self.dual_coef = svm.dual_coef_[0]
+        self.intercept = svm.intercept_[0]
+        self.gamma = svm._gamma
+
+    def decision_function(self, X):
+        X = np.atleast_2d(X)
+        sq_dist = self.sv_norms[None, :] - 2.0 * X @ self.support_vectors.T + (X ** 2).sum(axis=1)[:, None]
+        return np.exp(-self.gamma * sq_dist) @ self.dual_coef + self.intercept
+
+NOVELTY_BACKENDS = ("svm", "nystroem", "subsample")
+
+def make_novelty_model(backend="svm", nu=0.05):
+    """
+    Builds the Tech 2 novelty detector.
+      svm       - exact kernel One-Class SVM (quadratic fit, best for small histories)
+      nystroem  - Nystroem RBF approximation + SGDOneClassSVM (linear-time fit)
+      subsample - SubsampledOneClassSVM ensemble (constant-size fits)
+    """
+    if backend == "svm":
+        from sklearn.svm import OneClassSVM
+        return OneClassSVM(nu=nu)
+    if backend == "nystroem":
+        return NystroemOneClassSVM(nu=nu)
+    if backend == "subsample":
+        return SubsampledOneClassSVM(nu=nu)
+    raise ValueError(f"Unknown novelty backend '{backend}' (expected one of {NOVELTY_BACKENDS})")
+
 class AnomalySentinel:
-    def __init__(self):
+    def __init__(self, novelty="svm", risk_threshold=None):
+        from sklearn.ensemble import IsolationForest
+        from sklearn.preprocessing import StandardScaler
         self.scaler = StandardScaler()
         # Tech 1: Isolation Forest (Detects global outliers)
         self.iso_forest = IsolationForest(contamination=0.05, random_state=42)
         # Tech 2: One-Class SVM (Detects boundary violations/novelties)
-        self.svm = OneClassSVM(nu=0.05)
+        self.novelty = novelty
+        self.svm = make_novelty_model(novelty)
+        self.risk_threshold = RISK_THRESHOLD if risk_threshold is None else risk_threshold
+        # Spread of each model's decision_function on the training data; dividing
+        # by it puts both scores on one scale before they are fused
+        self.score_scales = np.ones(2)
         self.is_trained = False
 
     def _preprocess(self, df, training=False):
@@ -36,16 +223,21 @@ class AnomalySentinel:
         """
         data = df.copy()
         # Feature Engineering: Convert Timestamps to "Hour" (0-23)
-        data['hour'] = data['timestamp'].apply(lambda x: x.hour)
+        data['hour'] = self._hours(data)
         
         # Select numerical features for the AI
-        features = data[['qty', 'hour', 'damage_flag']]
+        features = data[FEATURES]
         
         if training:
             return self.scaler.fit_transform(features)
         else:
             return self.scaler.transform(features)
 
+    @staticmethod
+    def _hours(df):
+        """Vectorized hour-of-day (0-23) for the 'timestamp' column."""
+        return pd.to_datetime(df['timestamp']).dt.hour.to_numpy()
+
     def train(self, historical_data):
         """
         Learns 'Normal' behavior from historical data.
@@ -56,45 +248,102 @@ class AnomalySentinel:
         # Train both models
         self.iso_forest.fit(X)
         self.svm.fit(X)
+        self.score_scales = np.array([self.iso_forest.decision_function(X).std(),
+                                      self.svm.decision_function(X).std()])
+        self.score_scales[self.score_scales == 0] = 1.0
         self.is_trained = True
+        self._compile()
         print("Training Complete. Agent is online.")
 
+    def _compile(self):
+        """Precomputes the NumPy fast path used by score() (scaler + both models)."""
+        from sklearn.svm import OneClassSVM
+        self._mean = self.scaler.mean_
+        self._scale = self.scaler.scale_
+        self._fast_iso = FastIsolationForest(self.iso_forest)
+        self._fast_svm = FastOneClassSVM(self.svm) if isinstance(self.svm, OneClassSVM) else self.svm
+
+    def _fuse(self, iso_score, svm_score):
+        """Fused risk: the more alarming of the two scaled scores (> 0 means at least one model flags)."""
+        return np.maximum(-iso_score / self.score_scales[0], -svm_score / self.score_scales[1])
+
+    def score(self, transaction):
+        """
+        Low-latency scoring of one transaction dict: no DataFrame, inline scaling.
+        Returns the decision_function of both models (< 0 = anomaly) and the fused risk.
+        """
+        with stage("preprocess"):
+            x = np.array([[transaction['qty'], transaction['timestamp'].hour, transaction['damage_flag']]],
+                         dtype=np.float64)
+            x = (x - self._mean) / self._scale
+        with stage("isolation_forest"):
+            iso_score = float(self._fast_iso.decision_function(x)[0])
+        with stage("svm"):
+            svm_score = float(self._fast_svm.decision_function(x)[0])
+        return {"iso_forest": iso_score, "svm": svm_score, "risk": float(self._fuse(iso_score, svm_score))}
+
+    def save(self, path):
+        """
+        Persists the trained scaler + both models with the feature schema.
+        """
+        if not self.is_trained:
+            raise ValueError("Cannot save an untrained AnomalySentinel")
+        artifact = {
+            "schema_version": FEATURE_SCHEMA_VERSION,
+            "features": FEATURES,
+            "scaler": self.scaler,
+            "iso_forest": self.iso_forest,
+            "svm": self.svm,
+            "novelty": self.novelty,
+            "score_scales": self.score_scales,
+            "created_at": datetime.now().isoformat(),
+        }
+        joblib.dump(artifact, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads an artifact written by save(). Fails loudly if it was built
+        for a different feature schema.
+        """
+        artifact = joblib.load(path)
+        version = artifact.get("schema_version")
+        if version != FEATURE_SCHEMA_VERSION or artifact.get("features") != FEATURES:
+            raise ValueError(
+                f"Model artifact {path} has feature schema v{version} {artifact.get('features')}, "
+                f"expected v{FEATURE_SCHEMA_VERSION} {FEATURES}. Rebuild it with train.py."
+            )
+        agent = cls(novelty=artifact.get("novelty", "svm"))
+        agent.scaler = artifact["scaler"]
+        agent.iso_forest = artifact["iso_forest"]
+        agent.svm = artifact["svm"]
+        agent.score_scales = artifact.get("score_scales", np.ones(2))
+        agent.is_trained = True
+        agent._compile()
+        return agent
+
     def analyze_transaction(self, transaction):
         """
         The Main Pipeline: Rules -> AI -> RAG
         """
-        df = pd.DataFrame([transaction])
         current_hour = transaction['timestamp'].hour
-        reasons = []
-        status = "APPROVED"
 
         # --- LAYER 1: HARD RULES (Simple Thresholds) ---
-        # Rule: Large adjustment at 3 AM
-        if 2 <= current_hour <= 5 and transaction['qty'] > 100:
-            status = "AUTO-PAUSED"
-            reasons.append(f"Hard Rule Violation: High quantity move at {current_hour}:00.")
-            context = RAG_KNOWLEDGE_BASE["TIME_VIOLATION"]
-
-        # Rule: Transfer without receipt (Simulated by a flag here)
-        if transaction['type'] == 'transfer' and not transaction['has_receipt']:
-            status = "AUTO-PAUSED"
-            reasons.append("Hard Rule Violation: Missing Receipt.")
-            context = RAG_KNOWLEDGE_BASE["UNMATCHED_TRANSFER"]
+        with stage("rules"):
+            reasons, context = apply_hard_rules(transaction, current_hour)
 
         # If Hard Rules caught it, return early (efficiency)
-        if status == "AUTO-PAUSED":
-            return self._format_response(status, reasons, context)
+        if reasons:
+            metrics.inc("transactions", status="AUTO-PAUSED")
+            return self._format_response("AUTO-PAUSED", reasons, context)
 
         # --- LAYER 2: AI DETECTION (Isolation Forest + SVM) ---
+        scores = None
         if self.is_trained:
-            X = self._preprocess(df)
-            
-            # Isolation Forest Prediction (-1 is anomaly)
-            iso_pred = self.iso_forest.predict(X)[0]
-            # SVM Prediction (-1 is anomaly)
-            svm_pred = self.svm.predict(X)[0]
-
-            if iso_pred == -1 or svm_pred == -1:
+            # Isolation Forest + SVM decision scores (< 0 is anomaly), fused into one risk
+            scores = self.score(transaction)
+
+            if scores["risk"] > self.risk_threshold:
                 status = "FLAGGED_SUSPICIOUS"
                 reasons.append("AI Model detected statistical anomaly (Unusual Pattern).")
                 
@@ -104,15 +353,82 @@ class AnomalySentinel:
                 else:
                     context = RAG_KNOWLEDGE_BASE["STATISTICAL_ANOMALY"]
                     
-                return self._format_response(status, reasons, context)
+                metrics.inc("transactions", status=status)
+                return self._format_response(status, reasons, context, scores)
 
-        return self._format_response("APPROVED", ["Matches normal patterns"], "None")
+        metrics.inc("transactions", status="APPROVED")
+        return self._format_response("APPROVED", ["Matches normal patterns"], "None", scores)
 
-    def _format_response(self, status, reasons, context):
+    def analyze_batch(self, df):
+        """
+        Vectorized Rules -> AI -> RAG pipeline over a DataFrame of transactions.
+        Hard rules are applied as masks, and only the rows that survive them go
+        through the scaler and both models (one predict call each).
+        Returns one response per row, in input order.
+        """
+        df = df.reset_index(drop=True)
+        n = len(df)
+
+        # --- LAYER 1: HARD RULES (as masks) ---
+        with stage("rules"):
+            hours = self._hours(df)
+            qty = df['qty'].to_numpy()
+            time_rule = (hours >= 2) & (hours <= 5) & (qty > 100)
+            transfer_rule = (df['type'].to_numpy() == 'transfer') & ~df['has_receipt'].to_numpy(dtype=bool)
+            paused = time_rule | transfer_rule
+
+        # --- LAYER 2: AI DETECTION (survivors only) ---
+        flagged = np.zeros(n, dtype=bool)
+        iso_scores, svm_scores, risk = np.full(n, np.nan), np.full(n, np.nan), np.full(n, np.nan)
+        survivors = np.flatnonzero(~paused)
+        if self.is_trained and len(survivors):
+            with stage("preprocess"):
+                X = self._preprocess(df.iloc[survivors])
+            with stage("isolation_forest"):
+                iso_scores[survivors] = self.iso_forest.decision_function(X)
+            with stage("svm"):
+                svm_scores[survivors] = self.svm.decision_function(X)
+            risk[survivors] = self._fuse(iso_scores[survivors], svm_scores[survivors])
+            flagged[survivors] = risk[survivors] > self.risk_threshold
+        damaged = df['damage_flag'].to_numpy() == 1
+        n_paused, n_flagged = int(paused.sum()), int(flagged.sum())
+        metrics.inc("transactions", n_paused, status="AUTO-PAUSED")
+        metrics.inc("transactions", n_flagged, status="FLAGGED_SUSPICIOUS")
+        metrics.inc("transactions", n - n_paused - n_flagged, status="APPROVED")
+
+        results = []
+        for i in range(n):
+            if paused[i]:
+                reasons = []
+                if time_rule[i]:
+                    reasons.append(f"Hard Rule Violation: High quantity move at {hours[i]}:00.")
+                    context = RAG_KNOWLEDGE_BASE["TIME_VIOLATION"]
+                if transfer_rule[i]:
+                    reasons.append("Hard Rule Violation: Missing Receipt.")
+                    context = RAG_KNOWLEDGE_BASE["UNMATCHED_TRANSFER"]
+                results.append(self._format_response("AUTO-PAUSED", reasons, context))
+                continue
+            scores = None
+            if not np.isnan(risk[i]):
+                scores = {"iso_forest": float(iso_scores[i]), "svm": float(svm_scores[i]), "risk": float(risk[i])}
+            if flagged[i]:
+                context = RAG_KNOWLEDGE_BASE["DAMAGE_SPIKE" if damaged[i] else "STATISTICAL_ANOMALY"]
+                results.append(self._format_response(
+                    "FLAGGED_SUSPICIOUS",
+                    ["AI Model detected statistical anomaly (Unusual Pattern)."],
+                    context,
+                    scores,
+                ))
+            else:
+                results.append(self._format_response("APPROVED", ["Matches normal patterns"], "None", scores))
+        return results
+
+    def _format_response(self, status, reasons, context, scores=None):
         return {
             "status": status,
             "reasons": reasons,
-            "rag_context": context
+            "rag_context": context,
+            "scores": scores
         }
 
 # ==========================================
@@ -140,72 +456,76 @@ def generate_normal_data(n=1000):
 # ==========================================
 # PART 4: EXECUTION (RUNNING THE AGENT)
 # ==========================================
+# Run with: uv run python agent3.py   (trains on synthetic history and checks four demo transactions)
+def main():
+    # 1. Initialize
+    agent = AnomalySentinel()
 
-# 1. Initialize
-agent = AnomalySentinel()
+    # 2. Generate Data & Train
+    # We create "fake history" so the AI knows what "Normal" looks like
+    history_df = generate_normal_data(1000)
+    agent.train(history_df)
 
-# 2. Generate Data & Train
-# We create "fake history" so the AI knows what "Normal" looks like
-history_df = generate_normal_data(1000)
-agent.train(history_df)
+    print("\n" + "="*50)
+    print("STARTING LIVE MONITORING")
+    print("="*50)
 
-print("\n" + "="*50)
-print("STARTING LIVE MONITORING")
-print("="*50)
+    # 3. Test Cases
 
-# 3. Test Cases
+    # CASE A: Normal Transaction
+    trx_normal = {
+        'timestamp': datetime.now().replace(hour=14), # 2 PM
+        'qty': 55,
+        'damage_flag': 0,
+        'type': 'move',
+        'has_receipt': True
+    }
 
-# CASE A: Normal Transaction
-trx_normal = {
-    'timestamp': datetime.now().replace(hour=14), # 2 PM
-    'qty': 55,
-    'damage_flag': 0,
-    'type': 'move',
-    'has_receipt': True
-}
+    # CASE B: The "3 AM" Anomaly (Caught by Rules)
+    trx_hard_rule = {
+        'timestamp': datetime.now().replace(hour=3), # 3 AM
+        'qty': 500, # High Qty
+        'damage_flag': 0,
+        'type': 'move',
+        'has_receipt': True
+    }
 
-# CASE B: The "3 AM" Anomaly (Caught by Rules)
-trx_hard_rule = {
-    'timestamp': datetime.now().replace(hour=3), # 3 AM
-    'qty': 500, # High Qty
-    'damage_flag': 0,
-    'type': 'move',
-    'has_receipt': True
-}
+    # CASE C: The "Hidden" Anomaly (Caught by AI)
+    # Time is normal (10 AM), but Qty is HUGE (1000) - Rules might miss this, but AI sees the outlier
+    trx_ai_anomaly = {
+        'timestamp': datetime.now().replace(hour=10),
+        'qty': 2000, # Massive outlier compared to the avg of 50
+        'damage_flag': 0,
+        'type': 'move',
+        'has_receipt': True
+    }
 
-# CASE C: The "Hidden" Anomaly (Caught by AI)
-# Time is normal (10 AM), but Qty is HUGE (1000) - Rules might miss this, but AI sees the outlier
-trx_ai_anomaly = {
-    'timestamp': datetime.now().replace(hour=10),
-    'qty': 2000, # Massive outlier compared to the avg of 50
-    'damage_flag': 0,
-    'type': 'move',
-    'has_receipt': True
-}
+    # CASE D: Damage Spike (Caught by SVM)
+    trx_damage = {
+        'timestamp': datetime.now().replace(hour=11),
+        'qty': 40,
+        'damage_flag': 1, # DAMAGED
+        'type': 'move',
+        'has_receipt': True
+    }
 
-# CASE D: Damage Spike (Caught by SVM)
-trx_damage = {
-    'timestamp': datetime.now().replace(hour=11),
-    'qty': 40,
-    'damage_flag': 1, # DAMAGED
-    'type': 'move',
-    'has_receipt': True
-}
+    # 4. Run Checks
+    test_cases = [
+        ("Normal Move", trx_normal),
+        ("3 AM Violation", trx_hard_rule),
+        ("Massive Theft", trx_ai_anomaly),
+        ("Damage Report", trx_damage)
+    ]
+
+    for name, trx in test_cases:
+        result = agent.analyze_transaction(trx)
+        print(f"\nChecking: {name}...")
+        print(f"STATUS:  {result['status']}")
+        if result['status'] != "APPROVED":
+            print(f"REASON:  {result['reasons'][0]}")
+            print(f"CONTEXT: {result['rag_context']}")
+        else:
+            print("REASON:  Transaction looks safe.")
 
-# 4. Run Checks
-test_cases = [
-    ("Normal Move", trx_normal),
-    ("3 AM Violation", trx_hard_rule),
-    ("Massive Theft", trx_ai_anomaly),
-    ("Damage Report", trx_damage)
-]
-
-for name, trx in test_cases:
-    result = agent.analyze_transaction(trx)
-    print(f"\nChecking: {name}...")
-    print(f"STATUS:  {result['status']}")
-    if result['status'] != "APPROVED":
-        print(f"REASON:  {result['reasons'][0]}")
-        print(f"CONTEXT: {result['rag_context']}")
-    else:
-        print("REASON:  Transaction looks safe.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Benchmark: per-row analyze_transaction vs vectorized analyze_batch
+# Run with: uv run python bench_batch.py [--sizes 1000 10000 100000]
+import argparse
+import time
+
+import numpy as np
+
+from agent3 import AnomalySentinel, generate_normal_data
+
+
+def make_workload(n, seed=0):
+    """Normal history plus a sprinkle of rule violations and outliers."""
+    rng = np.random.default_rng(seed)
+    df = generate_normal_data(n)
+    k = max(1, n // 50)
+    night = rng.choice(n, k, replace=False)
+    df.loc[night, 'timestamp'] = df.loc[night, 'timestamp'].apply(lambda t: t.replace(hour=3))
+    df.loc[night, 'qty'] = 500
+    transfers = rng.choice(n, k, replace=False)
+    df.loc[transfers, 'type'] = 'transfer'
+    df.loc[transfers, 'has_receipt'] = False
+    outliers = rng.choice(n, k, replace=False)
+    df.loc[outliers, 'qty'] = 2000
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark analyze_batch against the per-row path")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--per-row-limit", type=int, default=2000,
+                        help="Time the per-row path on at most this many rows and extrapolate")
+    args = parser.parse_args()
+
+    agent = AnomalySentinel()
+    agent.train(generate_normal_data(1000))
+
+    print(f"\n{'rows':>8} | {'per-row (s)':>12} | {'batch (s)':>10} | {'speedup':>8}")
+    print("-" * 48)
+    for n in args.sizes:
+        df = make_workload(n)
+        records = df.to_dict('records')
+
+        t0 = time.perf_counter()
+        batch = agent.analyze_batch(df)
+        t_batch = time.perf_counter() - t0
+
+        m = min(n, args.per_row_limit)
+        t0 = time.perf_counter()
+        single = [agent.analyze_transaction(r) for r in records[:m]]
+        t_row = (time.perf_counter() - t0) * n / m
+
+        # Scores come from the NumPy fast path vs sklearn here: compare verdicts, not floats
+        verdicts = lambda rs: [(r['status'], r['reasons'], r['rag_context']) for r in rs]
+        assert verdicts(single) == verdicts(batch[:m]), "batch results diverge from per-row path"
+        est = " (est.)" if m < n else ""
+        print(f"{n:>8} | {t_row:>12.3f} | {t_batch:>10.3f} | {t_row / t_batch:>7.1f}x{est}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Benchmark: novelty backends (kernel SVM vs Nystroem+SGD vs subsampled ensemble)
+# Run with: uv run python bench_novelty.py [--sizes 10000 100000 1000000]
+import argparse
+import pickle
+import time
+import tracemalloc
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from agent3 import NOVELTY_BACKENDS, make_novelty_model
+
+
+def make_features(n, rng):
+    """Same distribution as generate_normal_data, built directly as a feature matrix."""
+    qty = rng.normal(50, 15, n).astype(int)
+    hour = rng.integers(8, 19, n)
+    damage = (rng.random(n) < 0.02).astype(int)
+    return np.column_stack([qty, hour, damage]).astype(float)
+
+
+def make_eval_set(rng, n=10000):
+    """Mostly normal moves plus 5% outliers (huge qty / odd hours)."""
+    X = make_features(n, rng)
+    k = n // 20
+    X[:k, 0] = rng.integers(300, 3000, k)
+    X[k:2 * k, 1] = rng.integers(0, 6, k)
+    return X
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark novelty backends for the Anomaly Sentinel")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--backends", nargs="+", choices=NOVELTY_BACKENDS, default=list(NOVELTY_BACKENDS))
+    parser.add_argument("--svm-limit", type=int, default=100000,
+                        help="Skip the exact kernel SVM above this many rows (quadratic fit)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X_eval_raw = make_eval_set(rng)
+
+    print(f"{'rows':>8} | {'backend':>9} | {'fit (s)':>8} | {'predict (us/row)':>16} | "
+          f"{'fit peak (MB)':>13} | {'model (MB)':>10} | {'agree w/ svm':>12}")
+    print("-" * 96)
+    for n in args.sizes:
+        X_raw = make_features(n, rng)
+        scaler = StandardScaler().fit(X_raw)
+        X, X_eval = scaler.transform(X_raw), scaler.transform(X_eval_raw)
+
+        reference = None
+        for backend in args.backends:
+            if backend == "svm" and n > args.svm_limit:
+                print(f"{n:>8} | {backend:>9} | {'skipped (n > --svm-limit)':>42}")
+                continue
+            model = make_novelty_model(backend)
+
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            model.fit(X)
+            t_fit = time.perf_counter() - t0
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+
+            t0 = time.perf_counter()
+            pred = model.predict(X_eval)
+            t_pred = (time.perf_counter() - t0) / len(X_eval) * 1e6
+
+            size = len(pickle.dumps(model)) / 1e6
+            if backend == "svm":
+                reference = pred
+            agree = f"{(pred == reference).mean():.1%}" if reference is not None else "n/a"
+            print(f"{n:>8} | {backend:>9} | {t_fit:>8.2f} | {t_pred:>16.2f} | "
+                  f"{peak:>13.1f} | {size:>10.2f} | {agree:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Benchmark: per-call latency of the legacy DataFrame + predict() path vs AnomalySentinel.score()
+# Run with: uv run python bench_score.py [--calls 2000]
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from agent3 import AnomalySentinel, generate_normal_data
+from bench_batch import make_workload
+
+
+def legacy_predict(agent, transaction):
+    """The pre-score() scoring path: one-row DataFrame, scaler.transform, two predict() calls."""
+    X = agent._preprocess(pd.DataFrame([transaction]))
+    return agent.iso_forest.predict(X)[0] == -1 or agent.svm.predict(X)[0] == -1
+
+
+def latencies_us(fn, records):
+    for r in records[:50]:  # warm-up
+        fn(r)
+    times = np.empty(len(records))
+    for i, r in enumerate(records):
+        t0 = time.perf_counter()
+        fn(r)
+        times[i] = time.perf_counter() - t0
+    return times * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-transaction scoring latency")
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    agent = AnomalySentinel()
+    agent.train(generate_normal_data(1000))
+    records = make_workload(args.calls).to_dict('records')
+
+    # Parity: the fast path reproduces sklearn's decision scores and the legacy verdict
+    df = pd.DataFrame(records)
+    X = agent._preprocess(df)
+    fast = [agent.score(r) for r in records]
+    iso_err = np.abs(np.array([s["iso_forest"] for s in fast]) - agent.iso_forest.decision_function(X)).max()
+    svm_err = np.abs(np.array([s["svm"] for s in fast]) - agent.svm.decision_function(X)).max()
+    legacy = np.array([legacy_predict(agent, r) for r in records])
+    mismatches = int(((np.array([s["risk"] for s in fast]) > 0) != legacy).sum())
+    print(f"\nparity: max |Δ| iso {iso_err:.1e}, svm {svm_err:.1e}; verdict mismatches {mismatches}/{len(records)}")
+
+    print(f"\n{'path':>28} | {'p50 (us)':>9} | {'p99 (us)':>9} | {'calls/s':>8}")
+    print("-" * 64)
+    base = None
+    for label, fn in [("DataFrame + predict()", lambda r: legacy_predict(agent, r)),
+                      ("score()", agent.score),
+                      ("analyze_transaction()", agent.analyze_transaction)]:
+        t = latencies_us(fn, records)
+        p50 = np.percentile(t, 50)
+        base = base or p50
+        print(f"{label:>28} | {p50:>9.1f} | {np.percentile(t, 99):>9.1f} | {1e6 / t.mean():>8.0f}"
+              f"  ({base / p50:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# Inference execution layer for Agent 3
+# Scoring runs in a process pool (model loaded once per worker), concurrent requests are
+# micro-batched into one vectorized analyze_batch call, and a bounded queue applies backpressure.
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from agent3 import AnomalySentinel
+from instrumentation import metrics
+
+# Per-worker model, loaded once by _init_worker
+_AGENT = None
+
+
+def _init_worker(model_path):
+    global _AGENT
+    _AGENT = AnomalySentinel.load(model_path)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _score_batch(records):
+    """Results plus this worker's stage timings since its last batch (merged into the parent's /metrics)."""
+    return _AGENT.analyze_batch(pd.DataFrame(records)), metrics.drain()
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the inference queue is at capacity (callers should shed load / retry)."""
+
+
+class InferencePool:
+    """
+    Async front-end over a ProcessPoolExecutor of AnomalySentinel workers.
+
+    score() enqueues one transaction; a background task drains the queue into
+    batches of up to max_batch_size, waiting at most max_wait_ms for stragglers,
+    and keeps at most one batch in flight per worker. score_many() items count
+    against the same max_queue while they are being scored.
+    """
+
+    def __init__(self, agent, model_path=None, workers=2, max_batch_size=256,
+                 max_wait_ms=2.0, max_queue=10000, chunk_size=5000):
+        if model_path is None:
+            # Hand the in-memory model to the workers through a temp artifact
+            fd, model_path = tempfile.mkstemp(prefix="sentinel-", suffix=".joblib")
+            os.close(fd)
+            agent.save(model_path)
+            self._temp_model = model_path
+        else:
+            self._temp_model = None
+        self.model_path = model_path
+        self.workers = workers
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue = max_queue
+        self.chunk_size = chunk_size
+
+        self._executor = None
+        self._queue = None
+        self._inflight = None
+        self._task = None
+        self._dispatches = set()
+        self._many_pending = 0  # score_many() items accepted but not yet scored
+
+        # Metrics
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.inflight = 0
+        self.max_batch_seen = 0
+        self.batch_size_buckets = {1: 0, 8: 0, 32: 0, 128: 0, "+Inf": 0}
+
+    async def start(self):
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_path,),
+        )
+        # Warm every worker up front so the first requests don't pay for model loading
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self._executor, _ping) for _ in range(self.workers)])
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._inflight = asyncio.Semaphore(self.workers)
+        self._task = asyncio.create_task(self._run())
+
+    async def shutdown(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._temp_model and os.path.exists(self._temp_model):
+            os.remove(self._temp_model)
+
+    def _admit(self, n):
+        """Raises QueueFullError unless n more items fit in max_queue."""
+        pending = self._queue.qsize() + self._many_pending
+        if pending + n > self.max_queue:
+            self.rejected += n
+            raise QueueFullError(f"Inference queue is full ({pending} pending, {n} more requested, "
+                                 f"capacity {self.max_queue})")
+
+    async def score(self, transaction):
+        """Scores one transaction through the micro-batcher."""
+        self._admit(1)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((transaction, future))
+        return await future
+
+    async def score_many(self, transactions):
+        """Scores an already-batched request, split into chunks across the workers."""
+        self._admit(len(transactions))
+        self._many_pending += len(transactions)
+        try:
+            loop = asyncio.get_running_loop()
+            chunks = [transactions[i:i + self.chunk_size] for i in range(0, len(transactions), self.chunk_size)]
+            t0 = time.perf_counter()
+            parts = await asyncio.gather(*[loop.run_in_executor(self._executor, _score_batch, c) for c in chunks])
+        finally:
+            self._many_pending -= len(transactions)
+        for _, worker_metrics in parts:
+            metrics.merge(worker_metrics)
+        self._log_batch("score_many", len(transactions), time.perf_counter() - t0)
+        return [result for part, _ in parts for result in part]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._inflight.acquire()
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch):
+        self._record_batch(len(batch))
+        self.inflight += 1
+        t0 = time.perf_counter()
+        try:
+            results, worker_metrics = await asyncio.get_running_loop().run_in_executor(
+                self._executor, _score_batch, [transaction for transaction, _ in batch])
+            metrics.merge(worker_metrics)
+            self._log_batch("micro_batch", len(batch), time.perf_counter() - t0)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.inflight -= 1
+            self._inflight.release()
+
+    def _log_batch(self, kind, size, seconds):
+        metrics.observe("inference_batch_seconds", seconds, kind=kind)
+        metrics.log_batch("sentinel_batch", kind=kind, size=size, latency_s=round(seconds, 6))
+
+    def _record_batch(self, size):
+        self.batches += 1
+        self.items += size
+        self.max_batch_seen = max(self.max_batch_seen, size)
+        for bound in self.batch_size_buckets:
+            if bound == "+Inf" or size <= bound:
+                self.batch_size_buckets[bound] += 1
+                break
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queue_depth": (self._queue.qsize() if self._queue else 0) + self._many_pending,
+            "queue_capacity": self.max_queue,
+            "inflight_batches": self.inflight,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "batch_size_buckets": {str(k): v for k, v in self.batch_size_buckets.items()},
+            "rejected": self.rejected,
+        }
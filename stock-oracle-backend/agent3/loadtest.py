@@ -0,0 +1,127 @@
+# Load test for the Agent 3 API — compares inline scoring with the inference pool
+# Run with: uv run python loadtest.py --compare            (spawns local uvicorn instances)
+#      or:  uv run python loadtest.py --url http://127.0.0.1:8000
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_payload(rng):
+    if rng.random() < 0.05:
+        return {"qty": rng.randint(300, 3000), "hour": rng.randint(0, 23), "damage_flag": 0,
+                "type": "move", "has_receipt": True}
+    return {"qty": int(rng.gauss(50, 15)), "hour": rng.randint(8, 18),
+            "damage_flag": int(rng.random() < 0.02), "type": "move", "has_receipt": True}
+
+
+def run_load(url, requests, concurrency, seed=0):
+    """Fires `requests` POST /analyze_transaction calls from `concurrency` keep-alive clients."""
+    target = urlparse(url)
+    per_client = requests // concurrency
+
+    def client(i):
+        rng = random.Random(seed + i)
+        conn = http.client.HTTPConnection(target.hostname, target.port)
+        latencies, errors = [], 0
+        for _ in range(per_client):
+            body = json.dumps(make_payload(rng))
+            t0 = time.perf_counter()
+            conn.request("POST", "/analyze_transaction", body, {"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            latencies.append(time.perf_counter() - t0)
+            errors += resp.status != 200
+        conn.close()
+        return latencies, errors
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(client, range(concurrency)))
+    elapsed = time.perf_counter() - t0
+
+    latencies = np.array([l for lats, _ in results for l in lats]) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": sum(e for _, e in results),
+        "throughput": len(latencies) / elapsed,
+        "p50": np.percentile(latencies, 50),
+        "p95": np.percentile(latencies, 95),
+        "p99": np.percentile(latencies, 99),
+    }
+
+
+def fetch_stats(url):
+    target = urlparse(url)
+    conn = http.client.HTTPConnection(target.hostname, target.port)
+    conn.request("GET", "/inference/stats")
+    return json.loads(conn.getresponse().read())
+
+
+def spawn_server(port, workers):
+    env = {**os.environ, "SENTINEL_WORKERS": str(workers)}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            fetch_stats(f"http://127.0.0.1:{port}")
+            return proc
+        except OSError:
+            time.sleep(0.25)
+    proc.kill()
+    raise RuntimeError(f"uvicorn on port {port} did not come up")
+
+
+def print_row(label, r):
+    print(f"{label:>16} | {r['throughput']:>9.0f} | {r['p50']:>8.1f} | {r['p95']:>8.1f} | "
+          f"{r['p99']:>8.1f} | {r['errors']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test POST /analyze_transaction")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--compare", action="store_true",
+                        help="Spawn uvicorn with SENTINEL_WORKERS=0 and with the pool, and compare")
+    parser.add_argument("--workers", type=int, default=2, help="Pool size used with --compare")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{'config':>16} | {'req/s':>9} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'errors':>6}")
+    print("-" * 70)
+    if not args.compare:
+        print_row("target", run_load(args.url, args.requests, args.concurrency))
+        return
+
+    for workers in (0, args.workers):
+        proc = spawn_server(args.port, workers)
+        url = f"http://127.0.0.1:{args.port}"
+        try:
+            run_load(url, min(500, args.requests), args.concurrency, seed=99)  # warm-up
+            print_row("inline" if workers == 0 else f"pool x{workers}",
+                      run_load(url, args.requests, args.concurrency))
+            if workers:
+                stats = fetch_stats(url)
+                print(f"{'':>16}   avg batch {stats['avg_batch_size']}, max batch {stats['max_batch_size']}, "
+                      f"rejected {stats['rejected']}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
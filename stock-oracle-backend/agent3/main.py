@@ -1,11 +1,68 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware 
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import List
+import os
+import time
 import pandas as pd
 from agent3 import AnomalySentinel, generate_normal_data 
+from inference import InferencePool, QueueFullError
+from instrumentation import metrics, profiled
 
-app = FastAPI()
+# Pre-trained artifact built offline with: uv run python train.py
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "sentinel.joblib")
+
+# Inference layer: SENTINEL_WORKERS=0 scores inline (one request at a time in the threadpool)
+INFERENCE_WORKERS = int(os.environ.get("SENTINEL_WORKERS", "2"))
+# Built in lifespan(), so importing this module (tests, tooling) stays cheap
+agent = None
+inference = None
+
+def load_agent():
+    """The pre-trained artifact if there is one, else a Sentinel trained on synthetic history."""
+    model_path = os.environ.get("SENTINEL_MODEL")
+    if model_path or os.path.exists(DEFAULT_MODEL_PATH):
+        # Explicit SENTINEL_MODEL must exist and match the schema (fail loudly)
+        model_path = model_path or DEFAULT_MODEL_PATH
+        agent = AnomalySentinel.load(model_path)
+        print(f"Loaded pre-trained Agent 3 from {model_path}")
+        return agent, model_path
+    agent = AnomalySentinel(novelty=os.environ.get("SENTINEL_NOVELTY", "svm"))
+    # Train on startup (using synthetic data for the hackathon)
+    history = generate_normal_data(1000)
+    agent.train(history)
+    return agent, None
+
+@asynccontextmanager
+async def lifespan(app):
+    global agent, inference
+    # PROFILE=py-spy samples every thread for the whole server lifetime; PROFILE=cprofile
+    # only sees the event-loop thread (threadpool handlers need py-spy)
+    profiler = profiled("sentinel_api").start()
+    # 1. Initialize the Brain
+    print("Initializing Agent 3...")
+    agent, model_path = load_agent()
+    if INFERENCE_WORKERS > 0:
+        inference = InferencePool(
+            agent,
+            model_path=model_path,
+            workers=INFERENCE_WORKERS,
+            max_batch_size=int(os.environ.get("SENTINEL_MAX_BATCH", "256")),
+            max_wait_ms=float(os.environ.get("SENTINEL_MAX_WAIT_MS", "2")),
+            max_queue=int(os.environ.get("SENTINEL_MAX_QUEUE", "10000")),
+        )
+        await inference.start()
+        print(f"Inference pool online ({INFERENCE_WORKERS} workers)")
+    yield
+    if inference:
+        await inference.shutdown()
+    profiler.stop()
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for frontend communication
 app.add_middleware(
@@ -16,12 +73,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 1. Initialize the Brain
-print("Initializing Agent 3...")
-agent = AnomalySentinel()
-# Train on startup (using synthetic data for the hackathon)
-history = generate_normal_data(1000)
-agent.train(history)
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    metrics.observe("http_request_seconds", time.perf_counter() - t0, path=request.url.path,
+                    status=str(response.status_code))
+    return response
 
 # 2. Define the Data Format (What Odoo sends us)
 class TransactionRequest(BaseModel):
@@ -33,7 +91,7 @@ class TransactionRequest(BaseModel):
 
 # 3. The Endpoint
 @app.post("/analyze_transaction")
-def analyze(trx: TransactionRequest):
+async def analyze(trx: TransactionRequest):
     # Convert API data to the format our Agent expects
     transaction_data = {
         "timestamp": datetime.now().replace(hour=trx.hour), # Mocking the time for the demo
@@ -44,8 +102,66 @@ def analyze(trx: TransactionRequest):
     }
     
     # Run the Agent
-    result = agent.analyze_transaction(transaction_data)
-    
-    return result
+    if inference is None:
+        return await run_in_threadpool(agent.analyze_transaction, transaction_data)
+    try:
+        return await inference.score(transaction_data)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+# 4. Batch Endpoint (e.g. Odoo replaying a day of stock moves)
+@app.post("/analyze_transactions")
+async def analyze_many(trxs: List[TransactionRequest]):
+    now = datetime.now()
+    records = [{
+        "timestamp": now.replace(hour=t.hour), # Mocking the time for the demo
+        "qty": t.qty,
+        "damage_flag": t.damage_flag,
+        "type": t.type,
+        "has_receipt": t.has_receipt,
+    } for t in trxs]
+
+    if not records:
+        return []
+    if inference is None:
+        t0 = time.perf_counter()
+        results = await run_in_threadpool(agent.analyze_batch, pd.DataFrame(records))
+        metrics.log_batch("sentinel_batch", kind="inline", size=len(records),
+                          latency_s=round(time.perf_counter() - t0, 6))
+        return results
+    try:
+        return await inference.score_many(records)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+# 5. Health check (requests are only served once lifespan() has the model and the pool up)
+@app.get("/health")
+def health():
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "novelty": agent.novelty,
+        "inference_workers": INFERENCE_WORKERS if inference is not None else 0,
+    }
+
+# 6. Inference Stats (queue depth, batch sizes, rejections)
+@app.get("/inference/stats")
+def inference_stats():
+    if inference is None:
+        return {"workers": 0}
+    return inference.stats()
+
+# 7. Prometheus scrape target: stage timings (rules / preprocess / isolation_forest / svm),
+#    request latency, transaction outcomes and inference pool gauges
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    lines = [metrics.render()]
+    if inference is not None:
+        stats = inference.stats()
+        for name, kind in [("queue_depth", "gauge"), ("inflight_batches", "gauge"),
+                           ("batches", "counter"), ("items", "counter"), ("rejected", "counter")]:
+            metric = f"{metrics.prefix}_inference_{name}" + ("_total" if kind == "counter" else "")
+            lines.append(f"# TYPE {metric} {kind}\n{metric} {stats[name]}\n")
+    return "".join(lines)
 
-# Run with: uv run uvicorn main:app --reload --port 8000
\ No newline at end of file
+# Run with: uv run uvicorn main:app --reload --port 8000
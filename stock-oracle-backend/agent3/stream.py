@@ -0,0 +1,269 @@
+# Streaming mode for Agent 3 — scores a live move feed against per-user / per-location baselines
+# Run with: uv run python stream.py moves.jsonl [--follow]
+import argparse
+import csv
+import json
+import math
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from agent3 import RAG_KNOWLEDGE_BASE, apply_hard_rules
+
+
+class RunningBaseline:
+    """
+    Online statistics for one user or location, updated in O(1) per event:
+    Welford mean/variance of qty, an hour-of-day histogram and an EWMA damage rate.
+    """
+    __slots__ = ("count", "mean", "m2", "hours", "damage_rate")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.hours = [0] * 24
+        self.damage_rate = 0.0
+
+    def update(self, qty, hour, damage_flag, alpha=0.01):
+        self.count += 1
+        delta = qty - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (qty - self.mean)
+        self.hours[hour] += 1
+        self.damage_rate += alpha * (damage_flag - self.damage_rate)
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def zscore(self, qty):
+        std = self.std
+        return (qty - self.mean) / std if std > 0 else 0.0
+
+    def hour_share(self, hour):
+        return self.hours[hour] / self.count if self.count else 0.0
+
+
+class BaselineStore:
+    """LRU-bounded map of key -> RunningBaseline; cold keys are evicted first."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._baselines = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key):
+        baseline = self._baselines.get(key)
+        if baseline is None:
+            baseline = self._baselines[key] = RunningBaseline()
+            if len(self._baselines) > self.max_keys:
+                self._baselines.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._baselines.move_to_end(key)
+        return baseline
+
+    def __len__(self):
+        return len(self._baselines)
+
+
+class StreamingSentinel:
+    """
+    Rules -> per-user / per-location baselines -> RAG, without any model refit.
+    Each event is scored against the baseline *before* it is folded in.
+    """
+
+    def __init__(self, max_keys=100000, min_history=20, z_threshold=3.0,
+                 rare_hour_share=0.01, damage_threshold=0.015):
+        self.users = BaselineStore(max_keys)
+        self.locations = BaselineStore(max_keys)
+        self.min_history = min_history
+        self.z_threshold = z_threshold
+        self.rare_hour_share = rare_hour_share
+        self.damage_threshold = damage_threshold
+        self.processed = 0
+
+    def score(self, transaction):
+        transaction = coerce_transaction(transaction)
+        hour = transaction['timestamp'].hour
+        self.processed += 1
+
+        # --- LAYER 1: HARD RULES ---
+        reasons, context = apply_hard_rules(transaction, hour)
+        if reasons:
+            return _response("AUTO-PAUSED", reasons, context)
+
+        # --- LAYER 2: ONLINE BASELINES ---
+        qty, damage = transaction['qty'], transaction['damage_flag']
+        user = self.users.get(transaction.get('user_id', 'unknown'))
+        location = self.locations.get(transaction.get('location', 'unknown'))
+
+        reasons = []
+        context = RAG_KNOWLEDGE_BASE["STATISTICAL_ANOMALY"]
+        if user.count >= self.min_history:
+            z = user.zscore(qty)
+            if abs(z) >= self.z_threshold:
+                reasons.append(f"Quantity {qty} is {z:+.1f} std dev from this user's baseline.")
+            if user.hour_share(hour) < self.rare_hour_share:
+                reasons.append(f"User rarely operates at {hour}:00.")
+        if damage == 1 and location.count >= self.min_history and location.damage_rate > self.damage_threshold:
+            reasons.append(f"Damage rate at this location is {location.damage_rate:.1%}.")
+            context = RAG_KNOWLEDGE_BASE["DAMAGE_SPIKE"]
+
+        user.update(qty, hour, damage)
+        location.update(qty, hour, damage)
+
+        if reasons:
+            return _response("FLAGGED_SUSPICIOUS", reasons, context)
+        return _response("APPROVED", ["Matches normal patterns"], "None")
+
+
+def _response(status, reasons, context):
+    return {"status": status, "reasons": reasons, "rag_context": context}
+
+
+def _as_int(record, field, default=None):
+    """Integer field from JSON or CSV text; accepts "55.0" (pandas / spreadsheet exports), rejects "55.5"."""
+    value = record.get(field, default)
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field}={value!r} is not a number") from None
+    if not number.is_integer():
+        raise ValueError(f"{field}={value!r} is not a whole number")
+    return int(number)
+
+
+def coerce_transaction(record):
+    """
+    Normalizes a feed record (JSON or CSV strings) into the agent's transaction format.
+    Raises ValueError for a malformed record.
+    """
+    timestamp = record.get('timestamp')
+    if timestamp is None:
+        timestamp = datetime.now()
+    elif isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    has_receipt = record.get('has_receipt', True)
+    if isinstance(has_receipt, str):
+        has_receipt = has_receipt.strip().lower() in ("1", "true", "yes")
+    return {
+        **record,
+        'timestamp': timestamp,
+        'qty': _as_int(record, 'qty'),
+        'damage_flag': _as_int(record, 'damage_flag', 0),
+        'type': record.get('type', 'move'),
+        'has_receipt': has_receipt,
+    }
+
+
+# ==========================================
+# FEEDS
+# ==========================================
+def tail_file(path, follow=False, poll_interval=0.5, on_error=None):
+    """
+    Yields records from a JSONL or CSV file; with follow=True keeps tailing like `tail -f`.
+    A line that does not parse goes to on_error(line, error) and is skipped. While
+    following, a line is only parsed once its newline has been written.
+    """
+    is_csv = path.endswith(".csv")
+    header = None
+    pending = ""
+    with open(path, newline="") as f:
+        while True:
+            chunk = f.readline()
+            if not chunk and not follow:
+                chunk, pending = pending, ""  # last line without a trailing newline is complete at EOF
+                if not chunk:
+                    return
+            elif not chunk.endswith("\n"):
+                # Nothing new, or a line still being written: wait for the rest of it
+                pending += chunk
+                if not follow:
+                    continue
+                time.sleep(poll_interval)
+                continue
+            line, pending = pending + chunk, ""
+            if not line.strip():
+                continue
+            try:
+                if not is_csv:
+                    record = json.loads(line)
+                    if not isinstance(record, dict):
+                        raise ValueError("expected a JSON object")
+                elif header is None:
+                    header = next(csv.reader([line]))
+                    continue
+                else:
+                    record = dict(zip(header, next(csv.reader([line]))))
+            except (ValueError, csv.Error) as e:
+                if on_error is not None:
+                    on_error(line.rstrip("\r\n"), e)
+                continue
+            yield record
+
+
+async def consume_queue(queue, sentinel, on_result, on_error=None):
+    """
+    Scores transactions from an asyncio.Queue until a None sentinel is received.
+    A malformed transaction goes to on_error(transaction, error) (default: stderr);
+    task_done() is always called, so queue.join() cannot hang on a bad record.
+    """
+    while True:
+        transaction = await queue.get()
+        try:
+            if transaction is None:
+                return
+            try:
+                result = sentinel.score(transaction)
+            except ValueError as e:
+                if on_error is None:
+                    print(f"Rejected record {transaction}: {e}", file=sys.stderr)
+                else:
+                    on_error(transaction, e)
+                continue
+            on_result(transaction, result)
+        finally:
+            queue.task_done()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a transaction feed with online baselines")
+    parser.add_argument("path", help="JSONL or CSV feed of moves")
+    parser.add_argument("--follow", action="store_true", help="Keep tailing the file for new moves")
+    parser.add_argument("--max-keys", type=int, default=100000, help="LRU bound per baseline store")
+    parser.add_argument("--all", action="store_true", help="Also print approved moves")
+    args = parser.parse_args()
+
+    sentinel = StreamingSentinel(max_keys=args.max_keys)
+    rejected = 0
+
+    def reject(record, error):
+        # One bad row must not stop the feed
+        nonlocal rejected
+        rejected += 1
+        print(f"Rejected record {record!r}: {error}", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    try:
+        for record in tail_file(args.path, follow=args.follow, on_error=reject):
+            try:
+                result = sentinel.score(record)
+            except ValueError as e:
+                reject(record, e)
+                continue
+            if args.all or result["status"] != "APPROVED":
+                print(json.dumps({"transaction": record, **result}, default=str))
+    except KeyboardInterrupt:
+        pass
+    elapsed = time.perf_counter() - t0
+    print(f"Scored {sentinel.processed} moves in {elapsed:.2f}s "
+          f"({sentinel.processed / max(elapsed, 1e-9):,.0f}/s), "
+          f"{len(sentinel.users)} users / {len(sentinel.locations)} locations tracked, {rejected} rejected",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
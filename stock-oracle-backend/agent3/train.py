@@ -0,0 +1,43 @@
+# Offline trainer for Agent 3 — builds the model artifact that main.py loads on startup
+# Run with: uv run python train.py [--history moves.csv] [--out models/sentinel.joblib]
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from agent3 import NOVELTY_BACKENDS, AnomalySentinel, generate_normal_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the Anomaly Sentinel and save it to disk")
+    parser.add_argument("--history", help="CSV of historical moves (timestamp, qty, damage_flag). "
+                                          "Defaults to synthetic data.")
+    parser.add_argument("--rows", type=int, default=1000,
+                        help="Synthetic rows to generate when --history is not given")
+    parser.add_argument("--novelty", choices=NOVELTY_BACKENDS, default="svm",
+                        help="Novelty backend; use nystroem or subsample for large histories")
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                      "models", "sentinel.joblib"))
+    args = parser.parse_args()
+
+    if args.history:
+        history = pd.read_csv(args.history, parse_dates=['timestamp'])
+    else:
+        history = generate_normal_data(args.rows)
+
+    agent = AnomalySentinel(novelty=args.novelty)
+    t0 = time.perf_counter()
+    agent.train(history)
+    print(f"Fit took {time.perf_counter() - t0:.2f}s")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    agent.save(args.out)
+
+    t0 = time.perf_counter()
+    AnomalySentinel.load(args.out)
+    print(f"Saved → {args.out} (reload takes {(time.perf_counter() - t0) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
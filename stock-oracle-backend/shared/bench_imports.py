@@ -0,0 +1,70 @@
+# shared/bench_imports.py — cold import time of every agent entry point, and which heavy backends it drags in
+# Run with: python shared/bench_imports.py [--repeats 5] [--only agent3]
+#
+# Each import runs in a fresh interpreter (cwd = the agent's directory, as when it is
+# launched), so the numbers are what a health check, test or CLI pays before doing work.
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+BACKEND_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+AGENT_DIRS = {
+    "agent3": os.path.join(BACKEND_ROOT, "agent3"),
+    "agent2": os.path.join(BACKEND_ROOT, "agent2-predictive-guardian", "src"),
+}
+TARGETS = [
+    ("agent3", "agent3"), ("agent3", "main"), ("agent3", "inference"), ("agent3", "stream"), ("agent3", "train"),
+    ("agent2", "baselines"), ("agent2", "alerting"), ("agent2", "forecast_writer"), ("agent2", "lstm_model"),
+    ("agent2", "prophet_baseline"), ("agent2", "prophet_fleet"), ("agent2", "backtest"), ("agent2", "hierarchy"),
+    ("agent2", "hybrid_ensemble"), ("agent2", "forecast_api"), ("agent2", "train_lstm"),
+]
+HEAVY = ("torch", "prophet", "cmdstanpy", "sklearn", "scipy", "pandas", "fastapi", "onnxruntime")
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def time_import(agent, module):
+    probe = PROBE.format(module=module, heavy=HEAVY)
+    out = subprocess.run([sys.executable, "-c", probe], cwd=AGENT_DIRS[agent], capture_output=True, text=True)
+    if out.returncode != 0:
+        return None, out.stderr.strip().splitlines()[-1]
+    return json.loads(out.stdout.strip().splitlines()[-1]), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold import time of the agent modules")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--only", choices=sorted(AGENT_DIRS), default=None)
+    args = parser.parse_args()
+
+    print(f"{'module':>26} | {'median s':>8} | {'max s':>6} | heavy backends loaded")
+    print("-" * 90)
+    for agent, module in TARGETS:
+        if args.only and agent != args.only:
+            continue
+        runs, error = [], None
+        for _ in range(args.repeats):
+            result, error = time_import(agent, module)
+            if result is None:
+                break
+            runs.append(result)
+        name = f"{agent}/{module}"
+        if not runs:
+            print(f"{name:>26} | {'failed':>8} | {'':>6} | {error}")
+            continue
+        seconds = np.array([r["seconds"] for r in runs])
+        print(f"{name:>26} | {np.median(seconds):>8.2f} | {seconds.max():>6.2f} | {', '.join(runs[-1]['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
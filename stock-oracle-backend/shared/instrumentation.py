@@ -0,0 +1,296 @@
+# shared/instrumentation.py — stage timers, counters and latency histograms for both Python agents
+# Stdlib only, so Agent 2 (requirements.txt) and Agent 3 (uv) can both import it:
+#   sys.path.append(<stock-oracle-backend>/shared); from instrumentation import metrics, stage
+#
+#   with stage("lstm_step"): ...              time a block (also works as a decorator)
+#   metrics.inc("transactions", status="APPROVED")
+#   metrics.render()                          Prometheus text format, served at /metrics
+#   metrics.log_batch("hybrid_ensemble")      one JSON line of per-stage histograms since the last call
+#
+# Environment:
+#   METRICS_LOG=path.jsonl    where log_batch() appends (unset = off)
+#   PROFILE=cprofile|py-spy   profile the sections wrapped in profiled() / start_profile()
+#   PROFILE_DIR=dir           where profiles land (default ./profiles): <name>-<pid>.prof for
+#                             cProfile (snakeviz / pstats), <name>-<pid>.svg for py-spy
+import bisect
+import cProfile
+import json
+import os
+import signal
+import shutil
+import subprocess
+import threading
+import time
+
+# Upper bounds in seconds; the last bucket is +Inf
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PREFIX = "stock_oracle"
+METRICS_LOG = os.environ.get("METRICS_LOG")
+PROFILE = os.environ.get("PROFILE", "").lower()
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, counts, total, count):
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.sum += total
+        self.count += count
+
+    def quantile(self, q):
+        """Bucket upper bound holding the q-th observation (Prometheus histogram_quantile, no interpolation)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _fmt_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Registry:
+    """
+    Counters and histograms keyed by (name, labels). Thread-safe; every observation
+    also lands in a window that log_batch() / drain() hand out and reset, so
+    process-pool workers can ship their deltas back to the parent.
+    """
+
+    def __init__(self, prefix=PREFIX):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self._window = {}
+        self._window_counters = {}
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            self._window_counters[key] = self._window_counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            for table in (self.histograms, self._window):
+                hist = table.get(key)
+                if hist is None:
+                    hist = table[key] = Histogram()
+                hist.observe(seconds)
+
+    def stage(self, name):
+        """Times a block into the stage_seconds histogram: `with metrics.stage("svm"): ...`"""
+        return _StageTimer(self, name)
+
+    def drain(self):
+        """Window since the last drain as plain data (picklable), then resets the window."""
+        with self.lock:
+            window, counters = self._window, self._window_counters
+            self._window, self._window_counters = {}, {}
+        return {
+            "histograms": [(k, h.counts, h.sum, h.count) for k, h in window.items()],
+            "counters": list(counters.items()),
+        }
+
+    def merge(self, drained):
+        """Adds a drain() from another process (e.g. an inference worker)."""
+        with self.lock:
+            for key, counts, total, count in drained["histograms"]:
+                for table in (self.histograms, self._window):
+                    table.setdefault(key, Histogram()).merge(counts, total, count)
+            for key, value in drained["counters"]:
+                self.counters[key] = self.counters.get(key, 0) + value
+                self._window_counters[key] = self._window_counters.get(key, 0) + value
+
+    def summary(self, name="stage_seconds"):
+        """{stage: (count, total seconds)} for printing at the end of a batch job."""
+        with self.lock:
+            return {dict(labels).get("stage", ""): (h.count, h.sum)
+                    for (n, labels), h in self.histograms.items() if n == name}
+
+    def log_batch(self, event, path=None, **fields):
+        """
+        Appends one JSON line with per-stage latency histograms (and counters) observed
+        since the previous call; no-op unless METRICS_LOG or path is set.
+        """
+        path = path or METRICS_LOG
+        drained = self.drain()
+        if not path:
+            return None
+        record = {"ts": time.time(), "event": event, "pid": os.getpid(), **fields, "metrics": []}
+        for (name, labels), counts, total, count in drained["histograms"]:
+            hist = Histogram()
+            hist.merge(counts, total, count)
+            record["metrics"].append({
+                "name": name, **dict(labels), "count": count, "sum_s": round(total, 6),
+                "p50_s": hist.quantile(0.5), "p99_s": hist.quantile(0.99),
+                "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], counts)),
+            })
+        record["counters"] = [{"name": name, **dict(labels), "value": value}
+                              for (name, labels), value in drained["counters"]]
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        return record
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((k, h.counts[:], h.sum, h.count) for k, h in self.histograms.items())
+        seen = set()
+        for (name, labels), value in counters:
+            metric = f"{self.prefix}_{name}_total"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            lines.append(f"{metric}{_fmt_labels(labels)} {value}")
+        for (name, labels), counts, total, count in histograms:
+            metric = f"{self.prefix}_{name}"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} histogram")
+                seen.add(metric)
+            cumulative = 0
+            for bound, n in zip(BUCKETS + ("+Inf",), counts):
+                cumulative += n
+                lines.append(f"{metric}_bucket{_fmt_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{metric}_sum{_fmt_labels(labels)} {total}")
+            lines.append(f"{metric}_count{_fmt_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self._window.clear()
+            self._window_counters.clear()
+
+
+class _StageTimer:
+    """Context manager / decorator behind Registry.stage (a class: cheaper than @contextmanager)."""
+    __slots__ = ("registry", "name", "t0")
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe("stage_seconds", time.perf_counter() - self.t0, stage=self.name)
+
+    def __call__(self, fn):
+        registry, name = self.registry, self.name
+
+        def wrapper(*args, **kwargs):
+            with _StageTimer(registry, name):
+                return fn(*args, **kwargs)
+        wrapper.__name__, wrapper.__doc__ = fn.__name__, fn.__doc__
+        return wrapper
+
+
+# Process-wide registry
+metrics = Registry()
+
+
+def stage(name):
+    return metrics.stage(name)
+
+
+def print_stage_summary(title="Stage timings"):
+    """Banner-style table of every stage timed so far in this process."""
+    summary = metrics.summary()
+    if not summary:
+        return
+    print(f"\n{title}:")
+    for name, (count, total) in sorted(summary.items(), key=lambda kv: -kv[1][1]):
+        print(f"  {name:<22} {total:9.3f} s  ({count} call{'s' if count != 1 else ''})")
+
+
+# ==========================================
+# PROFILING HOOK
+# ==========================================
+class Profiler:
+    """
+    PROFILE=cprofile: cProfile of the calling thread → PROFILE_DIR/<name>-<pid>.prof.
+    PROFILE=py-spy:   `py-spy record` attached to this process (all threads, native-speed
+                      sampling; needs py-spy on PATH and ptrace rights) → <name>-<pid>.svg.
+    Anything else: no-op, so the hook can stay in production code.
+    """
+
+    def __init__(self, name, mode=None):
+        self.name = name
+        self.mode = PROFILE if mode is None else mode
+        self.path = None
+        self._profile = None
+        self._proc = None
+
+    def start(self):
+        if self.mode not in ("cprofile", "py-spy"):
+            return self
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = os.path.join(PROFILE_DIR, f"{self.name}-{os.getpid()}")
+        if self.mode == "cprofile":
+            self.path = base + ".prof"
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        elif shutil.which("py-spy"):
+            self.path = base + ".svg"
+            self._proc = subprocess.Popen(["py-spy", "record", "--pid", str(os.getpid()), "--output", self.path],
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            print("PROFILE=py-spy but py-spy is not on PATH; profiling disabled")
+        return self
+
+    def stop(self):
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.path)
+            self._profile = None
+            print(f"cProfile written to {self.path}")
+        if self._proc is not None:
+            self._proc.send_signal(signal.SIGINT)  # py-spy writes its output on SIGINT
+            self._proc.wait(timeout=60)
+            self._proc = None
+            print(f"py-spy profile written to {self.path}")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def start_profile(name):
+    """Starts the PROFILE hook for a section; call .stop() on the result when it ends."""
+    return Profiler(name).start()
+
+
+def profiled(name):
+    """`with profiled("train_lstm"): ...` — profiles the block when PROFILE is set."""
+    return Profiler(name)